@@ -92,3 +92,455 @@ print(f"CNF(sextr) : {CNF(sextr)}")
 assert decide(sextr)
 
 assert not decide(forall.x.y(exists.z((z < y) & (x < z))))
+
+# Rewrites that don’t change anything return the same formula without building any node
+from formula.types import NODE_COUNTERS  # noqa: E402
+
+expr = x + y * z
+constructions = NODE_COUNTERS["constructions"]
+assert f3.map_formula(lambda node: node) is f3
+assert f3[u:x] is f3
+assert expr.replace(u, 1) is expr
+assert NODE_COUNTERS["constructions"] == constructions
+
+# Variables and free variables are cached on each node
+from functions import free_variables  # noqa: E402
+
+f = forall.x(exists.y((x < y) & (y < z))) & (x < u)
+assert list(f) == [u, x, y, z]
+assert free_variables(f) == [u, x, z]
+assert f[x].is_free() and not f[y].is_free()
+assert u not in forall.u(x < y)
+
+# Statistics of decide
+from decision.stats import DecideStats  # noqa: E402
+
+stats = DecideStats()
+assert not decide(forall.x.z(exists.y(((x < y) & (y < z)) | (y < y))), stats=stats)
+assert stats.contradictions > 0 and stats.max_dnf_conjunctions > 0
+assert set(stats.times) == {
+    "PNF",
+    "all_exists",
+    "NNF",
+    "DNF",
+    "elim_variable",
+    "elim_variables",
+}
+
+# The calls are counted without replacing any method, and only while a call is measured
+from formula.types import CALL_COUNTERS, HashConsed  # noqa: E402
+
+hash_method = HashConsed.__hash__
+stats = DecideStats()
+try:
+    with stats.measure():
+        assert HashConsed.__hash__ is hash_method
+        hash(x < y)
+        raise KeyboardInterrupt()
+except KeyboardInterrupt:
+    pass
+assert stats.hashes >= 1 and CALL_COUNTERS["active"] == 0
+hashes = CALL_COUNTERS["hashes"]
+hash(x < y)
+assert CALL_COUNTERS["hashes"] == hashes
+
+# Non-prenex formulas are converted by PNF, with as few alternations as possible
+from prelude import PNF  # noqa: E402
+
+f = forall.x(exists.y(y < x) & exists.z(x < z))
+assert PNF(f).formula is forall.x(exists.y.z((y < x) & (x < z)))
+assert decide(f)
+assert not decide(forall.x(x < y) & exists.x(x < y))
+
+# Miniscoping
+from prelude import miniscope  # noqa: E402
+
+assert miniscope(exists.x(((x < y) & (z < u)) | (x == z))) is (
+    (z < u) & exists.x(x < y)
+) | exists.x(x == z)
+assert decide(f, miniscoping=True)
+assert not decide(forall.x(x < y) & exists.x(x < y), miniscoping=True)
+
+# Elimination ordering
+from decision.ordering import (  # noqa: E402
+    OrderingStrategy,
+    count_bounds,
+    given_order,
+    min_bound_product,
+)
+from decision.trace import Trace  # noqa: E402
+
+assert count_bounds((x < y) & ~(y < z)) == {x: (0, 1), y: (2, 0), z: (0, 1)}
+f = exists.x(exists.y(exists.z((x < z) & (z < y) & (x < y))))
+
+
+def elimination_order(ordering: OrderingStrategy) -> list[str]:
+    # The ordering is only used when the variables of a block are eliminated one by one
+    trace = Trace()
+    assert decide(f, ordering=ordering, block_elimination=False, trace=trace)
+    return [
+        event.variable.name
+        for event in trace.events
+        if event.name == "elim_variable" and event.variable is not None
+    ]
+
+
+assert elimination_order(given_order) == ["z", "y", "x"]
+assert elimination_order(min_bound_product)[0] != "z"
+
+# Conjunctions whose order graph has a cycle are dropped after each elimination
+from decision.elim import elim_variable  # noqa: E402
+from decision.order_graph import is_satisfiable  # noqa: E402
+assert not is_satisfiable([x < y, y < z, z < x])
+assert not is_satisfiable([x == y, y < z, z == x])
+assert is_satisfiable([x < y, y < z, x < z])
+assert len(elim_variable(u, DNF((x < y) & (y < z) & (z < x) & (u < x))).formula.formulas) == 0
+
+# Equalities are merged into classes, and the eliminated variable is replaced by its representative
+eliminated = elim_variable(u, DNF((u == x) & (u == y) & (u < z)))
+assert len(eliminated.formula.formulas) == 1
+assert [v.name for v in free_variables(eliminated)] == ["x", "y", "z"]
+
+# Blocks of existential quantifiers are eliminated at once, by projecting the order graph of each conjunction
+from decision.elim import elim_variables  # noqa: E402
+from prelude import Variable  # noqa: E402
+
+w = Variable("w")
+eliminated = elim_variables([u, y], DNF((x < u) & (u < y) & (y == z) & (u < w)))
+assert len(eliminated.formula.formulas) == 1
+assert [v.name for v in free_variables(eliminated)] == ["w", "x", "z"]
+assert len(elim_variables([u, y], DNF((x < u) & (u < y) & (y < x))).formula.formulas) == 0
+f = forall.x.y.z(((x < y) & (y < z)) >> (x < z))
+assert decide(f) and decide(f, block_elimination=False)
+
+# The literals of the DNF conversion are bits of an atom table, where `y = x` is `x = y`
+assert [len(conj.formulas) for conj in DNF((x == y) & (y == x)).formula.formulas] == [1]
+assert DNF((x == y) & ~(y == x)).formula.formulas == set()
+
+# Big conjunctions can be projected with NumPy matrices
+from decision.matrix_projection import HAS_NUMPY, project_matrix  # noqa: E402
+
+if HAS_NUMPY:
+    projected = project_matrix([x < u, u < y, y == z, u < w, x < w], [u, y])
+    assert projected is not None
+    assert projected.formulas == {x < z, x < w}
+    assert project_matrix([x < u, u < y, y < x], [u]) is None
+
+# Conjunctions can be eliminated by several processes (see the end of the file)
+from concurrent.futures import ProcessPoolExecutor  # noqa: E402
+
+from decision.parallel import (  # noqa: E402
+    decode_conjunctions,
+    elim_parallel,
+    encode_conjunctions,
+)
+
+dnf = DNF(((x < u) | (u == y) | (x == y)) & ((u < z) | (z < y)))
+conjs = list(dnf.formula.formulas)
+assert decode_conjunctions(encode_conjunctions(conjs)) == conjs  # type: ignore
+
+# Batches of formulas are decided in order, and a formula that takes too long doesn’t stall the others
+from functools import reduce  # noqa: E402
+
+from decision.batch import decide_many  # noqa: E402
+from prelude import close  # noqa: E402
+
+results = list(decide_many([exists.x(x < x), forall.x.y((x < y) >> ~(y < x))]))
+assert [(result.index, result.value) for result in results] == [(0, False), (1, True)]
+# Takes more than 20 seconds (each disjunct multiplies the size of the DNFs)
+variables = [Variable(f"v{i}") for i in range(12)]
+slow = close(
+    reduce(
+        lambda lhs, rhs: lhs | rhs,
+        [
+            (variables[i] < variables[(i + 1) % 12])
+            & (variables[(i + 3) % 12] < variables[(i + 5) % 12])
+            for i in range(12)
+        ],
+    )
+)
+results = list(decide_many([slow, exists.x(x == x)], timeout=0.1))
+assert [result.error for result in results] == ["timeout", None]
+assert results[1].value is True
+
+# Formulas and normal forms have a compact binary encoding
+from formula.serialize import dumps, loads  # noqa: E402
+from prelude import BoolOpType, FormulaSet  # noqa: E402
+
+for serialized in [
+    forall.x(exists.y((x < y) & (y + 2 * x == -3.5))),
+    (x == 10**30) | ~(y < -300),
+    FormulaSet({x < y, y == z}, BoolOpType.CONJ),
+]:
+    assert loads(dumps(serialized)).is_syntaxically_eq(serialized)
+for form in [DNF((x < y) | (z == x) & (y < z)), CNF((x < y) | (z == x) & (y < z))]:
+    decoded = loads(dumps(form))
+    assert type(decoded) is type(form) and decoded.formula == form.formula
+chain = reduce(lambda lhs, rhs: lhs & rhs, [variables[i % 8] < w for i in range(5000)])
+assert loads(dumps(chain)) is chain
+quantified = dumps(exists.x(x < y))
+dnf_data = dumps(DNF((x < y) | (z == x) & (y < z)))
+for invalid in [
+    b"",
+    b"FML\x00",
+    dumps(chain)[:-1],
+    # `Not` and `DNF` of a variable
+    b"FML\x01\x01\x01x\x02\x00\x00\x0a\x01",
+    b"FML\x01\x01\x01x\x02\x00\x00\x13\x01",
+    # The quantified variable and the formula swapped
+    quantified[:-2] + quantified[-1:] + quantified[-2:-1],
+    # A DNF read as a CNF
+    dnf_data[:-2] + bytes([20]) + dnf_data[-1:],
+]:
+    try:
+        loads(invalid)
+        assert False
+    except ValueError:
+        pass
+
+# Results can be stored in a persistent cache, shared by the workers of `decide_many`
+import os  # noqa: E402
+import sqlite3  # noqa: E402
+import tempfile  # noqa: E402
+
+from decision.cache import DecideCache  # noqa: E402
+from prelude import NumConst  # noqa: E402
+
+with tempfile.TemporaryDirectory() as directory:
+    cache = DecideCache(os.path.join(directory, "cache.db"))
+    stats = DecideStats()
+    assert decide(forall.x(exists.y(x < y)), cache=cache, stats=stats)
+    assert stats.cache_hits == 0
+    assert decide(forall.x(exists.y(x < y)), cache=cache, stats=stats)
+    assert stats.cache_hits == 1
+    # Each entry only holds the statistics of the call that computed it
+    assert not decide(exists.x(forall.y(x < y)), cache=cache, stats=stats)
+    first = cache.get(forall.x(exists.y(x < y)))
+    second = cache.get(exists.x(forall.y(x < y)))
+    assert first is not None and second is not None
+    assert first.stats.cache_hits == second.stats.cache_hits == 0
+    assert first.stats.hashes + second.stats.hashes == stats.hashes
+    assert second.stats.total_time < stats.total_time
+    batch = [forall.x(exists.y(x < y)), exists.x(x < x), forall.x(exists.y(y < x))]
+    assert cache.warm_up(batch * 2) == 2
+    results = list(decide_many(batch, cache=cache))
+    assert [(result.value, result.cached) for result in results] == [
+        (True, True),
+        (False, True),
+        (True, True),
+    ]
+    assert cache.prefetch(batch) == 3 and len(cache) == 4
+    cache.close()
+
+    # The least recently used results are evicted
+    small = DecideCache(os.path.join(directory, "small.db"), max_bytes=1000)
+    for i in range(10):
+        small.put(exists.x(x < NumConst(i)), True)
+    assert small.size() <= 1000
+    assert small.get(exists.x(x < NumConst(9))) is not None
+    assert small.get(exists.x(x < NumConst(0))) is None
+    small.close()
+
+    # A lookup interrupted while it marks its entries as used leaves no transaction open
+    connection = small._connect()
+    interrupted: list[bool] = []
+
+    def interrupt_once() -> bool:
+        if connection.in_transaction and not interrupted:
+            interrupted.append(True)
+            return True
+        return False
+
+    connection.set_progress_handler(interrupt_once, 1)
+    try:
+        small.get(exists.x(x < NumConst(9)))
+        assert False
+    except sqlite3.OperationalError:
+        pass
+    connection.set_progress_handler(None, 1)
+    assert not connection.in_transaction
+    assert small.get(exists.x(x < NumConst(9))) is not None
+    small.close()
+
+# Formulas that only differ by the names of their bound variables and the order of their operands
+# have the same digest
+from prelude import Quantifier, QuantifierType, alpha_normalize, formula_digest  # noqa: E402
+from decision.cache import cache_key  # noqa: E402
+
+assert formula_digest(forall.x(exists.y(x < y))) == formula_digest(
+    forall.u(exists.w(u < w))
+)
+assert formula_digest(
+    forall.x(exists.y((x < y) & (y == x) | (z < x)))
+) == formula_digest(forall.u(exists.w((z < u) | (u == w) & (u < w))))
+assert formula_digest(forall.x(exists.y(x < y))) != formula_digest(
+    forall.x(exists.y(y < x))
+)
+first, second = Variable("#0"), Variable("#1")
+assert alpha_normalize(forall.x(exists.y(x < y))) is Quantifier(
+    QuantifierType.FORALL,
+    first,
+    Quantifier(QuantifierType.EXISTS, second, first < second),
+)
+assert alpha_normalize(forall.x(first < x)) is Quantifier(
+    QuantifierType.FORALL, Variable("##0"), first < Variable("##0")
+)
+with tempfile.TemporaryDirectory() as directory:
+    cache = DecideCache(os.path.join(directory, "cache.db"))
+    decide(forall.x(exists.y(x < y)), cache=cache)
+    assert cache.get(forall.u(exists.w(u < w))) is not None
+    # The free variables are closed first
+    assert cache_key(x < y) == formula_digest(close(x < y)) != formula_digest(x < y)
+    cache.close()
+
+# A long chain of `∨` (or of `∧`) is converted as a single node, in linear time
+from formula.forms import CONVERSION_COUNTERS  # noqa: E402
+
+links = [Variable(f"c{i}") for i in range(5001)]
+for join in [lambda lhs, rhs: lhs | rhs, lambda lhs, rhs: lhs & rhs]:
+    long_chain = reduce(join, [links[i] < links[i + 1] for i in range(5000)])
+    literal_sets = CONVERSION_COUNTERS["literal_sets"]
+    assert len(DNF(long_chain).formula.formulas) * len(
+        CNF(long_chain).formula.formulas
+    ) == 5000
+    # The atoms, then the whole chain for each conversion
+    assert CONVERSION_COUNTERS["literal_sets"] - literal_sets <= 2 * (5000 + 5000)
+
+# A contradictory conjunction is dropped before being multiplied by the other operands
+from formula.forms import PRUNING_COUNTERS  # noqa: E402
+
+pruned = dict(PRUNING_COUNTERS)
+wide = reduce(lambda lhs, rhs: lhs | rhs, [links[i] < links[i + 1] for i in range(20)])
+assert len(DNF((x < y) & wide & ~(x < y)).formula.formulas) == 0
+assert PRUNING_COUNTERS["contradictions"] - pruned["contradictions"] == 1
+assert PRUNING_COUNTERS["subsumed"] == pruned["subsumed"]
+
+# The example of the README never builds its 5 971 968 conjunctions
+pruned = dict(PRUNING_COUNTERS)
+stats = DecideStats()
+assert decide(exists.x(forall.y((x < y) | (x == y) | (y < x))), stats=stats)
+assert stats.max_dnf_conjunctions <= 4
+assert sum(PRUNING_COUNTERS[name] - pruned[name] for name in pruned) <= 4
+
+# Literals are complements whatever the orientation of their equality, in DNFs and in CNFs,
+# and the conjunctions (or clauses) that contain another one are removed
+for contradiction in [(x == y) & ~(y == x), ~(x == y) & (y == x), (y < z) & ~(y < z)]:
+    assert len(DNF(contradiction).formula.formulas) == 0
+    assert len(CNF(~contradiction).formula.formulas) == 0
+pruned = dict(PRUNING_COUNTERS)
+assert DNF((x < y) | (x < y) & (y == z)).formula.formulas == {
+    FormulaSet({x < y}, BoolOpType.CONJ)
+}
+assert CNF((x < y) & ((z == y) | (x < y))).formula.formulas == {
+    FormulaSet({x < y}, BoolOpType.DISJ)
+}
+assert PRUNING_COUNTERS["subsumed"] - pruned["subsumed"] == 2
+assert len(CNF(((x == y) | (u < w)) & (~(y == x) | (u < w))).formula.formulas) == 2
+
+# The NNF of a deeply nested formula is computed in linear time, and the tree of a DNF is built once
+from prelude import NNF  # noqa: E402
+
+nested = reduce(
+    lambda rhs, lhs: lhs & rhs,
+    [links[i] < links[i + 1] for i in reversed(range(5000))],
+)
+constructions = NODE_COUNTERS["constructions"]
+nnf = NNF(PNF(~nested))
+assert NODE_COUNTERS["constructions"] - constructions <= 5 * 5000
+assert nnf.formula is reduce(
+    lambda rhs, lhs: lhs | rhs,
+    [
+        (links[i] == links[i + 1]) | (links[i + 1] < links[i])
+        for i in reversed(range(5000))
+    ],
+)
+dnf = DNF(nnf)
+assert NNF(dnf).formula is NNF(dnf).formula
+constructions = NODE_COUNTERS["constructions"]
+assert PNF(dnf).formula is NNF(dnf).formula
+assert NODE_COUNTERS["constructions"] == constructions
+
+# The stages of `decide` can be traced, and the trace written as JSON Lines or as a Chrome trace
+import json  # noqa: E402
+
+trace = Trace()
+assert decide(forall.x(exists.y(x < y)), trace=trace)
+assert [
+    (event.name, None if event.variable is None else event.variable.name)
+    for event in trace.events
+] == [
+    ("PNF", None),
+    ("all_exists", None),
+    ("NNF", "y"),
+    ("DNF", "y"),
+    ("elim_variable", "y"),
+    ("NNF", "x"),
+    ("DNF", "x"),
+    ("elim_variable", "x"),
+]
+eliminated = trace.events[4]
+assert (eliminated.conjunctions_before, eliminated.atoms_before) == (1, 1)
+assert (eliminated.conjunctions_after, eliminated.atoms_after) == (1, 0)
+assert trace.events[3].conjunctions_before is None
+assert trace.events[3].conjunctions_after == 1
+assert all(event.duration >= 0 for event in trace.events)
+with tempfile.TemporaryDirectory() as directory:
+    trace.write_jsonl(os.path.join(directory, "trace.jsonl"))
+    with open(os.path.join(directory, "trace.jsonl")) as file:
+        lines = [json.loads(line) for line in file]
+    assert lines == [event.to_dict() for event in trace.events]
+    trace.write_chrome(os.path.join(directory, "trace.json"))
+    with open(os.path.join(directory, "trace.json")) as file:
+        chrome = json.load(file)["traceEvents"]
+    assert [event["name"] for event in chrome][2:5] == [
+        "NNF y",
+        "DNF y",
+        "elim_variable y",
+    ]
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in chrome)
+
+
+# Quantifiers are pushed into deeply nested formulas without reaching the recursion limit
+from formula.traversal import iter_nodes, sub_formulas_of  # noqa: E402
+
+deep = x < y
+for i in range(3000):
+    deep = (y < z) & deep if i % 2 else (y < u) | deep
+assert [
+    node
+    for node in iter_nodes(miniscope(exists.x(deep)), sub_formulas_of)
+    if isinstance(node, Quantifier)
+] == [exists.x(x < y)]
+for q in [exists, forall]:
+    closed_deep = q.y.z.u(exists.x(deep))
+    assert decide(closed_deep, miniscoping=True) == decide(closed_deep)
+
+# The checks that start worker processes only run in the main process : with the `spawn` start method,
+# the workers import this file again
+if __name__ == "__main__":
+    dnf = DNF(((x < u) | (u == y) | (x == y)) & ((u < z) | (z < y)))
+    with ProcessPoolExecutor(2) as executor:
+        parallel, _ = elim_parallel([u], dnf, executor)
+    assert parallel.formula.formulas == elim_variable(u, dnf).formula.formulas
+    assert decide(forall.x.y.z(((x < y) & (y < z)) >> (x < z)), workers=2)
+
+    results = list(
+        decide_many([exists.x(x < x), forall.x.y((x < y) >> ~(y < x))], workers=2)
+    )
+    assert [(result.index, result.value) for result in results] == [
+        (0, False),
+        (1, True),
+    ]
+
+    # The workers share the cache
+    with tempfile.TemporaryDirectory() as directory:
+        cache = DecideCache(os.path.join(directory, "cache.db"))
+        assert cache.warm_up(batch * 2, workers=2) == 3
+        results = list(decide_many(batch, workers=2, cache=cache))
+        assert [(result.value, result.cached) for result in results] == [
+            (True, True),
+            (False, True),
+            (True, True),
+        ]
+        assert len(cache) == 3
+        cache.close()
@@ -0,0 +1,122 @@
+"""
+Matrix projection benchmark (needs `numpy`).
+
+Checks `project_matrix` against `elim_variable` on small random conjunctions,
+then prints the time taken by `OrderGraph.project` and `project_matrix` for conjunctions of several sizes
+and densities, to find from which ones the matrices are faster (`python src/bench_matrix.py`).
+"""
+
+import random
+import time
+from typing import Callable
+
+import display
+from decision.elim import decide, elim_variable
+from decision.matrix_projection import prefers_matrix, project_matrix
+from decision.order_graph import OrderGraph
+from formula.boolop import BoolOpType
+from formula.comp import Comp, CompType
+from formula.forms import DNF
+from formula.formula_set import FormulaSet
+from formula.quantifier import Quantifier, QuantifierType
+from formula.types import LogicFormula
+from formula.variable import Variable
+
+CHECKS = 200
+CHECK_TERMS = 6
+REPEATS = 5
+# Numbers of terms and of atoms
+SIZES = [
+    (16, 64),
+    (32, 256),
+    (64, 512),
+    (64, 1024),
+    (128, 512),
+    (128, 4096),
+    (256, 1024),
+    (256, 8192),
+]
+
+
+def random_conj(
+    rng: random.Random, terms: int, atoms: int, reversed_chance: float
+) -> FormulaSet:
+    """
+    A conjunction of random comparisons, in increasing order (so satisfiable) except for a few of them.
+    """
+    variables = [Variable(f"v{i}") for i in range(terms)]
+    literals: set[LogicFormula] = set()
+    for _ in range(atoms):
+        lhs, rhs = sorted(rng.sample(range(terms), 2))
+        if rng.random() < reversed_chance:
+            lhs, rhs = rhs, lhs
+        comp = CompType.EQUAL if rng.random() < 0.1 else CompType.LOWER_THAN
+        literals.add(Comp(variables[lhs], comp, variables[rhs]))
+    return FormulaSet(literals, BoolOpType.CONJ)
+
+
+def check(rng: random.Random) -> None:
+    """
+    Checks that `project_matrix` is equivalent to eliminating the variables one after the other with `elim_variable`.
+    """
+    for _ in range(CHECKS):
+        conj = random_conj(rng, CHECK_TERMS, CHECK_TERMS + 2, 0.1)
+        variables = [Variable(f"v{i}") for i in range(CHECK_TERMS)]
+        eliminated = rng.sample(variables, CHECK_TERMS // 2)
+
+        expected = DNF(FormulaSet({conj}, BoolOpType.DISJ))
+        for variable in eliminated:
+            expected = elim_variable(variable, expected)
+        projected = project_matrix(conj.iter_formulas(), eliminated)
+        if projected is None:
+            assert len(expected.formula.formulas) == 0
+            continue
+
+        equivalence = (expected >> projected) & (projected >> expected)
+        for variable in variables:
+            if variable not in eliminated:
+                equivalence = Quantifier(QuantifierType.FORALL, variable, equivalence)
+        assert decide(equivalence), conj
+
+
+def measure(rng: random.Random, terms: int, atoms: int) -> tuple[float, float]:
+    """
+    Time (in seconds) taken by both engines to eliminate half of the terms of random satisfiable conjunctions.
+    """
+    conjs = [random_conj(rng, terms, atoms, 0.0) for _ in range(REPEATS)]
+    eliminated = [Variable(f"v{i}") for i in range(0, terms, 2)]
+
+    def best_time(project: Callable[[FormulaSet], object]) -> float:
+        # Best of 3 runs, the others are slowed down by the garbage collector or other processes
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            for conj in conjs:
+                project(conj)
+            times.append(time.perf_counter() - start)
+        return min(times) / REPEATS
+
+    def project_graph(conj: FormulaSet) -> object:
+        graph = OrderGraph(conj.iter_formulas())
+        return graph.is_satisfiable() and graph.project(eliminated)
+
+    return (
+        best_time(project_graph),
+        best_time(lambda conj: project_matrix(conj.iter_formulas(), eliminated)),
+    )
+
+
+if __name__ == "__main__":
+    display.PRINTING = False
+    rng = random.Random(0)
+    check(rng)
+    print(f"project_matrix matches elim_variable on {CHECKS} conjunctions")
+    for terms, atoms in SIZES:
+        graph_time, matrix_time = measure(rng, terms, atoms)
+        conj = random_conj(rng, terms, atoms, 0.0)
+        chosen = "matrices" if prefers_matrix(conj) else "OrderGraph"
+        print(
+            f"{terms:>4} terms, {atoms:>5} atoms : "
+            f"OrderGraph {graph_time * 1e3:7.3f} ms, matrices {matrix_time * 1e3:7.3f} ms "
+            f"(elim_variables uses {chosen})"
+        )
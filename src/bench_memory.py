@@ -0,0 +1,56 @@
+"""
+Memory benchmark.
+
+Builds a DNF with 10^5 atoms and prints how many bytes each node takes (`python src/bench_memory.py`).
+"""
+
+import sys
+import tracemalloc
+
+from formula.boolop import BoolOpType
+from formula.comp import Comp, CompType
+from formula.forms import DNF
+from formula.formula_set import FormulaSet
+from formula.variable import Variable
+
+ATOMS = 10**5
+CONJ_SIZE = 10
+VARIABLES = 400
+
+
+def build_dnf() -> DNF:
+    """
+    A disjunction of `ATOMS / CONJ_SIZE` conjunctions of `CONJ_SIZE` distinct comparisons each.
+    """
+    conjs: set[FormulaSet] = set()
+    for c in range(ATOMS // CONJ_SIZE):
+        atoms = set()
+        for k in range(CONJ_SIZE):
+            n = c * CONJ_SIZE + k
+            atoms.add(
+                Comp(
+                    Variable(f"v{n % VARIABLES}"),
+                    CompType.LOWER_THAN if n % 2 else CompType.EQUAL,
+                    Variable(f"v{n // VARIABLES}"),
+                )
+            )
+        conjs.add(FormulaSet(atoms, BoolOpType.CONJ))
+    return DNF(FormulaSet(conjs, BoolOpType.DISJ))  # type: ignore
+
+
+if __name__ == "__main__":
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    dnf = build_dnf()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    variables = {v for conj in dnf.formula.formulas for v in conj}
+    nodes = ATOMS + len(variables)
+    print(f"atoms                 : {ATOMS}")
+    print(f"nodes (atoms + vars)  : {nodes}")
+    print(f"total traced          : {after - before} bytes")
+    print(f"bytes per atom        : {(after - before) / ATOMS:.1f}")
+    print(f"bytes per node        : {(after - before) / nodes:.1f}")
+    print(f"sizeof(Comp)          : {sys.getsizeof(next(iter(next(iter(dnf.formula.formulas)).formulas)))}")  # type: ignore
+    print(f"sizeof(Variable)      : {sys.getsizeof(Variable('v0'))}")
@@ -0,0 +1,82 @@
+"""
+Elimination ordering benchmark.
+
+Decides random formulas with each strategy of `decision.ordering` and prints the time taken,
+the size of the largest intermediate DNF and the total size of all of them (`python src/bench_ordering.py`).
+"""
+
+import random
+import time
+from functools import reduce
+
+import display
+from decision.elim import decide
+from decision.ordering import given_order, min_bound_product
+from decision.trace import Trace
+from formula.quantifier import Quantifier, QuantifierType
+from formula.types import LogicFormula
+from formula.variable import Variable
+
+FORMULAS = 10
+VARIABLES = 10
+CLAUSES = 10
+STRATEGIES = {"given_order": given_order, "min_bound_product": min_bound_product}
+
+
+def random_formula(rng: random.Random) -> LogicFormula:
+    """
+    An existential block over a conjunction of disjunctions of two comparisons, whose variables have
+    very different numbers of bounds.
+
+    The first comparison of each disjunction follows a hidden order of the variables, so the formula is satisfiable
+    and the disjunctions are kept until the end, the second one is random.
+    """
+    variables = [Variable(f"v{i}") for i in range(VARIABLES)]
+    # The first variables are used much more often than the last ones
+    weights = [VARIABLES - i for i in range(VARIABLES)]
+    rank = {
+        variable: value
+        for value, variable in enumerate(rng.sample(variables, VARIABLES))
+    }
+
+    def pair() -> tuple[Variable, Variable]:
+        lhs, rhs = rng.choices(variables, weights, k=2)
+        while rhs is lhs:
+            rhs = rng.choice(variables)
+        return lhs, rhs
+
+    def clause() -> LogicFormula:
+        lhs, rhs = pair()
+        if rank[rhs] < rank[lhs]:
+            lhs, rhs = rhs, lhs
+        other_lhs, other_rhs = pair()
+        return (lhs < rhs) | (other_lhs < other_rhs)
+
+    formula = reduce(LogicFormula.__and__, [clause() for _ in range(CLAUSES)])
+    # In a random order, so that `given_order` doesn’t favour the most or the least used variables
+    for variable in rng.sample(variables, VARIABLES):
+        formula = Quantifier(QuantifierType.EXISTS, variable, formula)
+    return formula
+
+
+if __name__ == "__main__":
+    display.PRINTING = False
+    rng = random.Random(0)
+    formulas = [random_formula(rng) for _ in range(FORMULAS)]
+    for name, strategy in STRATEGIES.items():
+        trace = Trace()
+        start = time.perf_counter()
+        for formula in formulas:
+            assert decide(
+                formula, ordering=strategy, block_elimination=False, trace=trace
+            )
+        elapsed = time.perf_counter() - start
+        # The DNFs given by the eliminations (the first DNF doesn’t depend on the order)
+        eliminated = [event for event in trace.events if event.name == "elim_variable"]
+        conjunctions = [event.conjunctions_after or 0 for event in eliminated]
+        atoms = [event.atoms_after for event in eliminated]
+        print(
+            f"{name:<20}: {elapsed:.3f} s, "
+            f"largest DNF : {max(conjunctions)} conjunctions, {max(atoms)} atoms, "
+            f"all DNFs : {sum(conjunctions)} conjunctions, {sum(atoms)} atoms"
+        )
@@ -0,0 +1,63 @@
+"""
+Parallel elimination benchmark.
+
+Eliminates variables in a DNF of random conjunctions in the current process and with `elim_parallel`,
+and prints the time taken and the size of the pickled chunks (`python src/bench_parallel.py [workers]`).
+"""
+
+import os
+import pickle
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from decision.elim import elim_variables
+from decision.parallel import elim_parallel, encode_conjunctions
+from formula.boolop import BoolOpType
+from formula.comp import Comp, CompType
+from formula.forms import DNF
+from formula.formula_set import FormulaSet
+from formula.types import LogicFormula
+from formula.variable import Variable
+
+CONJUNCTIONS = 20000
+ATOMS = 12
+VARIABLES = 40
+
+
+def random_dnf(rng: random.Random) -> DNF:
+    """
+    A DNF of satisfiable conjunctions of random comparisons.
+    """
+    variables = [Variable(f"v{i}") for i in range(VARIABLES)]
+    conjs: set[FormulaSet] = set()
+    while len(conjs) < CONJUNCTIONS:
+        literals: set[LogicFormula] = set()
+        for _ in range(ATOMS):
+            lhs, rhs = sorted(rng.sample(range(VARIABLES), 2))
+            comp = CompType.EQUAL if rng.random() < 0.1 else CompType.LOWER_THAN
+            literals.add(Comp(variables[lhs], comp, variables[rhs]))
+        conjs.add(FormulaSet(literals, BoolOpType.CONJ))
+    return DNF(FormulaSet(conjs, BoolOpType.DISJ))  # type: ignore
+
+
+if __name__ == "__main__":
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1
+    dnf = random_dnf(random.Random(0))
+    conjs = list(dnf.formula.formulas)
+    eliminated = [Variable(f"v{i}") for i in range(VARIABLES // 2)]
+
+    print(f"pickled nodes         : {len(pickle.dumps(conjs))} bytes")
+    encoded = encode_conjunctions(conjs)  # type: ignore
+    print(f"pickled encoded       : {len(pickle.dumps(encoded))} bytes")
+
+    start = time.perf_counter()
+    sequential = elim_variables(eliminated, dnf)
+    print(f"current process       : {time.perf_counter() - start:.3f} s")
+
+    with ProcessPoolExecutor(workers) as executor:
+        start = time.perf_counter()
+        parallel, _ = elim_parallel(eliminated, dnf, executor)
+        print(f"{workers:>3} workers           : {time.perf_counter() - start:.3f} s")
+    assert parallel.formula.formulas == sequential.formula.formulas
@@ -0,0 +1,96 @@
+"""
+Serialization benchmark.
+
+Compares the size of `formula.serialize.dumps` and of `pickle`, and the time taken to encode and decode,
+on a big `DNF`, on many small formulas and on a long chain of conjunctions (`python src/bench_serialize.py`).
+"""
+
+import pickle
+import random
+import time
+from functools import reduce
+from typing import Any, Callable
+
+from bench_parallel import random_dnf
+from formula.comp import Comp, CompType
+from formula.quantifier import Quantifier, QuantifierType
+from formula.serialize import dumps, loads
+from formula.types import LogicFormula
+from formula.variable import Variable
+
+REPEATS = 5
+FORMULAS = 2000
+CHAIN = 20000
+
+
+def random_formula(rng: random.Random, variables: list[Variable]) -> LogicFormula:
+    """
+    A random closed formula with a few quantifiers over a conjunction of disjunctions of comparisons.
+    """
+    clauses = [
+        reduce(
+            lambda lhs, rhs: lhs | rhs,
+            [
+                Comp(
+                    rng.choice(variables),
+                    rng.choice(list(CompType)),
+                    rng.choice(variables),
+                )
+                for _ in range(3)
+            ],
+        )
+        for _ in range(4)
+    ]
+    formula = reduce(lambda lhs, rhs: lhs & rhs, clauses)
+    for variable in variables:
+        formula = Quantifier(rng.choice(list(QuantifierType)), variable, formula)
+    return formula
+
+
+def best_time(fn: Callable[[], Any]) -> float:
+    # Best of several runs, the others are slowed down by the garbage collector or other processes
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def compare(name: str, objs: list[Any]) -> None:
+    encoded = [dumps(obj) for obj in objs]
+    assert all(
+        type(loads(data)) is type(obj) for data, obj in zip(encoded, objs)
+    ), "round trip"
+    try:
+        pickled = [pickle.dumps(obj) for obj in objs]
+    except RecursionError:
+        print(
+            f"{name:<16}: {sum(map(len, encoded)):>9} bytes, "
+            "pickle fails (RecursionError)"
+        )
+        return
+    print(
+        f"{name:<16}: {sum(map(len, encoded)):>9} bytes vs {sum(map(len, pickled)):>9} pickled, "
+        f"dumps {best_time(lambda: [dumps(obj) for obj in objs]) * 1e3:7.1f} ms "
+        f"vs {best_time(lambda: [pickle.dumps(obj) for obj in objs]) * 1e3:7.1f} ms, "
+        f"loads {best_time(lambda: [loads(data) for data in encoded]) * 1e3:7.1f} ms "
+        f"vs {best_time(lambda: [pickle.loads(data) for data in pickled]) * 1e3:7.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    variables = [Variable(f"v{i}") for i in range(6)]
+    chain = reduce(
+        lambda lhs, rhs: lhs & rhs,
+        [
+            Comp(Variable(f"c{i}"), CompType.LOWER_THAN, Variable(f"c{i + 1}"))
+            for i in range(CHAIN)
+        ],
+    )
+    compare("DNF", [random_dnf(rng)])
+    compare(
+        "small formulas", [random_formula(rng, variables) for _ in range(FORMULAS)]
+    )
+    compare("chain", [chain])
@@ -0,0 +1,220 @@
+"""
+Deciding many independent formulas (see `decide_many`).
+"""
+
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    as_completed,
+    wait,
+)
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Iterable, Iterator
+
+import display
+from decision.elim import decide
+from decision.stats import DecideStats
+from formula.serialize import dumps, loads
+from formula.types import IntoLogicFormula, into_canonical_logic_formula
+
+type Chunk = list[tuple[int, IntoLogicFormula]]
+# Formulas sent to the workers are encoded by `formula.serialize` (smaller than pickled nodes,
+# and deep formulas don’t reach the recursion limit of `pickle`)
+type EncodedChunk = list[tuple[int, bytes]]
+
+
+class DecideResult:
+    """
+    The result of a formula given to `decide_many` : its position in the input, its truth value
+    (`None` if it wasn’t decided), the time it took (in seconds), why it wasn’t decided
+    (`"timeout"` or the exception raised by `decide`) and whether it was read from a `DecideCache`.
+    """
+
+    __slots__ = ("index", "value", "time", "error", "cached")
+
+    def __init__(
+        self,
+        index: int,
+        value: bool | None,
+        time: float,
+        error: str | None = None,
+        cached: bool = False,
+    ) -> None:
+        self.index = index
+        self.value = value
+        self.time = time
+        self.error = error
+        self.cached = cached
+
+    def __repr__(self) -> str:
+        if self.error is not None:
+            return (
+                f"DecideResult({self.index}, error={self.error!r}, time={self.time:.3f})"
+            )
+        return f"DecideResult({self.index}, {self.value}, time={self.time:.3f})"
+
+
+class _Timeout(Exception):
+    pass
+
+
+def _raise_timeout(signum: int, frame: Any) -> None:
+    raise _Timeout()
+
+
+@contextmanager
+def _time_limit(seconds: float | None) -> Iterator[None]:
+    """
+    Interrupts the block after `seconds` (only in the main thread of a process, on systems with `setitimer`).
+    """
+    if (
+        seconds is None
+        or not hasattr(signal, "setitimer")
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _decide_chunk(
+    chunk: Chunk, timeout: float | None, options: dict[str, Any]
+) -> list[DecideResult]:
+    """
+    Decides the formulas of a chunk without printing anything (in a worker or in the current process).
+    """
+    printing = display.PRINTING
+    display.PRINTING = False
+    results: list[DecideResult] = []
+    try:
+        for index, formula in chunk:
+            start = time.perf_counter()
+            try:
+                with _time_limit(timeout):
+                    if options.get("cache") is None:
+                        value = decide(formula, **options)
+                        cached = False
+                    else:
+                        stats = DecideStats()
+                        value = decide(formula, stats=stats, **options)
+                        cached = stats.cache_hits > 0
+                results.append(
+                    DecideResult(index, value, time.perf_counter() - start, cached=cached)
+                )
+            except _Timeout:
+                results.append(
+                    DecideResult(index, None, time.perf_counter() - start, "timeout")
+                )
+            except Exception as error:
+                results.append(
+                    DecideResult(index, None, time.perf_counter() - start, repr(error))
+                )
+    finally:
+        display.PRINTING = printing
+    return results
+
+
+def _decide_encoded_chunk(
+    chunk: EncodedChunk, timeout: float | None, options: dict[str, Any]
+) -> list[DecideResult]:
+    return _decide_chunk(
+        [(index, loads(data)) for index, data in chunk],  # type: ignore
+        timeout,
+        options,
+    )
+
+
+def _encode_chunk(chunk: Chunk) -> EncodedChunk:
+    return [
+        (index, dumps(into_canonical_logic_formula(formula)))
+        for index, formula in chunk
+    ]
+
+
+def _chunks(formulas: Iterable[IntoLogicFormula], chunksize: int) -> Iterator[Chunk]:
+    numbered = enumerate(formulas)
+    while chunk := list(islice(numbered, chunksize)):
+        yield chunk
+
+
+def decide_many(
+    formulas: Iterable[IntoLogicFormula],
+    workers: int = 1,
+    chunksize: int = 1,
+    ordered: bool = True,
+    timeout: float | None = None,
+    executor: Executor | None = None,
+    **options: Any,
+) -> Iterator[DecideResult]:
+    """
+    Decides closed formulas independently, and gives a `DecideResult` for each one as soon as it is known :
+    in the order of `formulas` if `ordered`, else as they are completed.
+
+    The formulas are read lazily and decided by chunks of `chunksize` in `workers` processes (or in the current
+    process if `workers` is 1), which are kept for the whole batch. An `executor` can also be given
+    to reuse its processes across batches. A formula that takes more than `timeout` seconds is interrupted,
+    so that it doesn’t stall the batch.
+
+    The `timeout` is implemented with `SIGALRM` (and `setitimer`) in the process that decides the formula,
+    which is the calling process when `workers` is 1 and no `executor` is given : the previous `SIGALRM` handler
+    and interval timer are replaced while each formula is decided (the handler is restored afterwards,
+    the timer is cleared). Without `setitimer`, or outside the main thread, `timeout` is ignored.
+
+    The other `options` are given to `decide` (they must be picklable to be sent to the workers).
+    With a `cache` (see `DecideCache`), the formulas already decided are only looked up,
+    and the workers store the results of the others.
+    """
+    assert chunksize >= 1 and workers >= 1
+    chunks = _chunks(formulas, chunksize)
+    if executor is None and workers == 1:
+        for chunk in chunks:
+            yield from _decide_chunk(chunk, timeout, options)
+        return
+
+    own_executor = executor is None
+    pool = ProcessPoolExecutor(workers) if executor is None else executor
+    # Chunks submitted in advance, so that the workers never wait for the consumer of the results
+    in_flight = 2 * workers
+    try:
+        if ordered:
+            queue: deque[Future[list[DecideResult]]] = deque()
+            for chunk in chunks:
+                queue.append(
+                    pool.submit(
+                        _decide_encoded_chunk, _encode_chunk(chunk), timeout, options
+                    )
+                )
+                if len(queue) >= in_flight:
+                    yield from queue.popleft().result()
+            while queue:
+                yield from queue.popleft().result()
+        else:
+            running: set[Future[list[DecideResult]]] = set()
+            for chunk in chunks:
+                running.add(
+                    pool.submit(
+                        _decide_encoded_chunk, _encode_chunk(chunk), timeout, options
+                    )
+                )
+                if len(running) >= in_flight:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+            for future in as_completed(running):
+                yield from future.result()
+    finally:
+        if own_executor:
+            pool.shutdown(cancel_futures=True)
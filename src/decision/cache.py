@@ -0,0 +1,256 @@
+"""
+Persistent cache of the results of `decide` (see the `cache` argument of `decide` and `decide_many`).
+"""
+
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Iterable
+
+from decision.stats import DecideStats
+from formula.types import IntoLogicFormula
+from functions import close
+from functions import formula_digest
+
+# 64 MiB
+DEFAULT_MAX_BYTES = 1 << 26
+# Bytes counted for an entry besides its digest and its statistics (value, size, date, index)
+ENTRY_OVERHEAD = 32
+# Number of digests looked up in a single query
+LOOKUP_BATCH = 500
+
+_SCHEMA = """
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS results (
+    digest TEXT PRIMARY KEY,
+    value INTEGER NOT NULL,
+    stats TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+CREATE TABLE IF NOT EXISTS usage (bytes INTEGER NOT NULL);
+INSERT INTO usage SELECT 0 WHERE NOT EXISTS (SELECT * FROM usage);
+COMMIT;
+"""
+
+
+def cache_key(f: IntoLogicFormula) -> str:
+    """
+    The key of a formula in a `DecideCache` : the digest of its closure (see `functions.formula_digest`),
+    so formulas that only differ by the names of their bound variables and the order of their operands share their entry.
+    """
+    return formula_digest(close(f))
+
+
+class CachedResult:
+    """
+    A result of `decide` read from a `DecideCache`, with the statistics of the call that computed it.
+    """
+
+    __slots__ = ("value", "stats")
+
+    def __init__(self, value: bool, stats: DecideStats) -> None:
+        self.value = value
+        self.stats = stats
+
+
+class DecideCache:
+    """
+    Results of `decide`, stored in an SQLite database at `path` by the digest of the formulas (see `cache_key`).
+
+    Several processes can use the same database at once (each one opens its own connection, and a `DecideCache`
+    can be sent to the workers of `decide_many`). When the entries take more than `max_bytes`,
+    the least recently used ones are evicted.
+    """
+
+    __slots__ = ("path", "max_bytes", "_connection", "_pid", "_prefetched")
+
+    def __init__(
+        self, path: str | os.PathLike[str], max_bytes: int = DEFAULT_MAX_BYTES
+    ) -> None:
+        self.path = os.fspath(path)
+        self.max_bytes = max_bytes
+        self._connection: sqlite3.Connection | None = None
+        self._pid = 0
+        # Entries read by `prefetch`, by digest
+        self._prefetched: dict[str, CachedResult] = {}
+
+    def __getstate__(self) -> tuple[str, int]:
+        # The connection can’t be shared with other processes
+        return (self.path, self.max_bytes)
+
+    def __setstate__(self, state: tuple[str, int]) -> None:
+        self.__init__(*state)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid != os.getpid():
+            # Transactions are started explicitly, with `BEGIN IMMEDIATE` for the writes,
+            # so that concurrent writers wait for each other (up to `timeout`) instead of failing
+            connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            try:
+                connection.executescript(_SCHEMA)
+            except BaseException:
+                if connection.in_transaction:
+                    connection.execute("ROLLBACK")
+                raise
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def close(self) -> None:
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT count(*) FROM results").fetchone()[0]
+
+    def size(self) -> int:
+        """
+        The number of bytes taken by the entries (as counted for the eviction).
+        """
+        return self._connect().execute("SELECT bytes FROM usage").fetchone()[0]
+
+    def _lookup(self, digests: list[str]) -> dict[str, CachedResult]:
+        """
+        Reads the entries of `digests`, and marks them as used.
+        """
+        connection = self._connect()
+        found: dict[str, CachedResult] = {}
+        now = time.time()
+        for i in range(0, len(digests), LOOKUP_BATCH):
+            batch = digests[i : i + LOOKUP_BATCH]
+            placeholders = ", ".join("?" * len(batch))
+            rows = connection.execute(
+                "SELECT digest, value, stats FROM results "
+                f"WHERE digest IN ({placeholders})",
+                batch,
+            ).fetchall()
+            for digest, value, stats in rows:
+                found[digest] = CachedResult(
+                    bool(value), DecideStats.from_dict(json.loads(stats))
+                )
+            if rows:
+                try:
+                    connection.execute("BEGIN IMMEDIATE")
+                    connection.executemany(
+                        "UPDATE results SET last_used = ? WHERE digest = ?",
+                        [(now, digest) for digest, _, _ in rows],
+                    )
+                    connection.execute("COMMIT")
+                except BaseException:
+                    # Also on a timeout of `decide_many`, so that the connection can still be used
+                    if connection.in_transaction:
+                        connection.execute("ROLLBACK")
+                    raise
+        return found
+
+    def get(self, f: IntoLogicFormula) -> CachedResult | None:
+        digest = cache_key(f)
+        prefetched = self._prefetched.get(digest)
+        if prefetched is not None:
+            return prefetched
+        return self._lookup([digest]).get(digest)
+
+    def put(
+        self, f: IntoLogicFormula, value: bool, stats: DecideStats | None = None
+    ) -> None:
+        """
+        Stores the result of `decide(f)`, then evicts the least recently used entries if the cache is too big.
+        """
+        digest = cache_key(f)
+        encoded_stats = json.dumps((stats or DecideStats()).to_dict())
+        size = len(digest) + len(encoded_stats) + ENTRY_OVERHEAD
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            previous = connection.execute(
+                "SELECT size FROM results WHERE digest = ?", (digest,)
+            ).fetchone()
+            connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                (digest, int(value), encoded_stats, size, time.time()),
+            )
+            connection.execute(
+                "UPDATE usage SET bytes = bytes + ?",
+                (size - (previous[0] if previous else 0),),
+            )
+            self._evict(connection)
+            connection.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        self._prefetched.pop(digest, None)
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        used = connection.execute("SELECT bytes FROM usage").fetchone()[0]
+        excess = used - self.max_bytes
+        if excess <= 0:
+            return
+        evicted: list[tuple[str]] = []
+        freed = 0
+        for digest, size in connection.execute(
+            "SELECT digest, size FROM results ORDER BY last_used"
+        ):
+            evicted.append((digest,))
+            freed += size
+            if freed >= excess:
+                break
+        connection.executemany("DELETE FROM results WHERE digest = ?", evicted)
+        connection.execute("UPDATE usage SET bytes = bytes - ?", (freed,))
+
+    def clear(self) -> None:
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute("DELETE FROM results")
+            connection.execute("UPDATE usage SET bytes = 0")
+            connection.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        self._prefetched.clear()
+
+    def prefetch(self, formulas: Iterable[IntoLogicFormula]) -> int:
+        """
+        Reads the entries of `formulas` in a few queries and keeps them in memory, so that the next `get`s
+        of these formulas don’t access the database.
+
+        Returns the number of formulas found.
+        """
+        digests = list({cache_key(f) for f in formulas})
+        found = self._lookup(digests)
+        self._prefetched.update(found)
+        return len(found)
+
+    def warm_up(
+        self,
+        formulas: Iterable[IntoLogicFormula],
+        workers: int = 1,
+        chunksize: int = 1,
+        **options: Any,
+    ) -> int:
+        """
+        Decides the formulas that are not in the cache yet (with `decide_many`) and stores their results,
+        so that deciding them later is only a lookup.
+
+        Returns the number of formulas that were decided.
+        """
+        from decision.batch import decide_many
+
+        by_digest = {cache_key(f): f for f in formulas}
+        self._prefetched.update(self._lookup(list(by_digest)))
+        missing = [
+            f for digest, f in by_digest.items() if digest not in self._prefetched
+        ]
+        for _ in decide_many(
+            missing, workers=workers, chunksize=chunksize, cache=self, **options
+        ):
+            pass
+        return len(missing)
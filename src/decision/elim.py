@@ -1,57 +1,305 @@
-from display import show
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Iterable
+
+from decision.cache import DecideCache
+from decision.equalities import EqualityClasses
+from decision.matrix_projection import prefers_matrix, project_matrix
+from decision.order_graph import OrderGraph, is_satisfiable
+from decision.parallel import PARALLEL_MIN_CONJUNCTIONS, elim_parallel
+from decision.ordering import OrderingStrategy, min_bound_product
+from decision.stats import DecideStats
+from decision.trace import Trace, traced_stage
+from display import Verbosity, show
 from formula.boolconst import BoolConst
 from formula.boolop import BoolOpType
 from formula.comp import Comp, CompType
 from formula.forms import DNF, NNF, PNF, FormulaSet
 from formula.formula_set import flatten_conj
-from formula.quantifier import QuantifierType
-from formula.types import IntoLogicFormula, LogicFormula
-from formula.variable import IntoVariable, into_variable
+from formula.quantifier import Quantifier, QuantifierType
+from formula.traversal import fold, sub_formulas_of
+from formula.types import IntoLogicFormula, LogicFormula, into_canonical_logic_formula
+from formula.variable import IntoVariable, Variable, into_variable
 from functions import (
     all_exists,
     close,
     compute_formula_only_constants,
     free_variables,
+    miniscope,
     separate_quantifiers,
 )
 
 
-def decide(f: IntoLogicFormula, display: bool = True) -> bool:
+def decide(
+    f: IntoLogicFormula,
+    display: bool = True,
+    trace: Trace | None = None,
+    stats: DecideStats | None = None,
+    miniscoping: bool = False,
+    ordering: OrderingStrategy = min_bound_product,
+    block_elimination: bool = True,
+    workers: int = 1,
+    cache: DecideCache | None = None,
+) -> bool:
+    """
+    Decides a formula of dense linear orders without endpoints.
+
+    If a `Trace` is given, an event is added to it for each stage.
+    If a `DecideStats` is given, it is filled with the statistics of the call.
+    If `miniscoping` is `True`, the quantifiers are pushed inward (see `miniscope`) instead of being moved to the front,
+    and each one is eliminated in the sub-formula it applies to.
+    Otherwise, each block of consecutive quantifiers is eliminated at once (see `elim_variables`),
+    or one variable after the other if `block_elimination` is `False`, in the order chosen by `ordering`
+    (see `decision.ordering`).
+    If `workers` is more than 1, the conjunctions of the biggest DNFs are eliminated by as many processes
+    (see `decision.parallel`).
+    If a `DecideCache` is given, the result is read from it if the formula was already decided,
+    and stored in it (along with the statistics of the call) otherwise.
+    """
+    if cache is not None:
+        cached = cache.get(f)
+        if cached is not None:
+            if stats is not None:
+                stats.cache_hits += 1
+            return cached.value
+        # Only the statistics of this call are stored, `stats` may already hold those of other calls
+        measured = DecideStats()
+        value = decide(
+            f,
+            display,
+            trace,
+            measured,
+            miniscoping,
+            ordering,
+            block_elimination,
+            workers,
+        )
+        cache.put(f, value, measured)
+        if stats is not None:
+            stats.merge(measured)
+        return value
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            return _decide_measured(
+                f, trace, stats, miniscoping, ordering, block_elimination, executor
+            )
+    return _decide_measured(
+        f, trace, stats, miniscoping, ordering, block_elimination, None
+    )
+
+
+def _decide_measured(
+    f: IntoLogicFormula,
+    trace: Trace | None,
+    stats: DecideStats | None,
+    miniscoping: bool,
+    ordering: OrderingStrategy,
+    block_elimination: bool,
+    executor: Executor | None,
+) -> bool:
+    if stats is None:
+        return _decide(
+            f, trace, None, miniscoping, ordering, block_elimination, executor
+        )
+    with stats.measure():
+        return _decide(
+            f, trace, stats, miniscoping, ordering, block_elimination, executor
+        )
+
+
+def _decide(
+    f: IntoLogicFormula,
+    trace: Trace | None,
+    stats: DecideStats | None,
+    miniscoping: bool,
+    ordering: OrderingStrategy,
+    block_elimination: bool,
+    executor: Executor | None,
+) -> bool:
     closed = close(f)
-    show(f"\x1b[1mTrying to decide formula : {closed}\x1b[22m")
-    prenex = PNF(closed)
-    alle = all_exists(prenex)
+    show("\x1b[1mTrying to decide formula : {}\x1b[22m", closed)
+    if miniscoping:
+        current_formula = _eliminate_miniscoped(closed, trace, stats, executor)
+    else:
+        current_formula = _eliminate_prenex(
+            closed, trace, stats, ordering, block_elimination, executor
+        )
+    show("Final formula : {}", current_formula)
+    return compute_formula_only_constants(current_formula)
+
+
+def _eliminate_prenex(
+    closed: LogicFormula,
+    trace: Trace | None,
+    stats: DecideStats | None,
+    ordering: OrderingStrategy,
+    block_elimination: bool,
+    executor: Executor | None,
+) -> LogicFormula:
+    """
+    Eliminates all the quantifiers of a closed formula, once they are moved to the front.
+    """
+    with traced_stage(trace, "PNF", closed, stats=stats) as stage:
+        stage.formula = PNF(closed)
+    prenex = stage.formula
+    with traced_stage(trace, "all_exists", prenex, stats=stats) as stage:
+        stage.formula = all_exists(prenex)
+    alle = stage.formula
 
-    show(f"  (quantifiers replaced) : {alle}")
+    show("  (quantifiers replaced) : {}", alle, level=Verbosity.STEPS)
     quantifiers, current_formula = separate_quantifiers(alle)
 
     #TODO : fix decide procedure issue  sextr is false
     # decide(forall.x.y(exists.z((z<y)&(x<z))))
 
+    # Blocks of quantifiers without negation between them, their variables can be eliminated in any order
+    blocks: list[tuple[list[Variable], bool]] = []
+    block: list[Variable] = []
     for inv, qt, var in quantifiers:
         assert qt == QuantifierType.EXISTS
-        # if invert:
-        #     current_formula = Not(current_formula)
-        show(
-            f"Eliminating \x1b[1;4mvariable {var}\x1b[22;24m in formula {current_formula} :\n"
-        )
-        current_formula = NNF(PNF(current_formula))
-        show(f"  - NNF : {current_formula}\n")
-        current_formula = DNF(current_formula)
-        show(f"  - DNF : {current_formula}\n")
-        current_formula = elim_variable(var, current_formula)
+        block.append(var)
+        if inv:
+            blocks.append((block, True))
+            block = []
+    if len(block) > 0:
+        blocks.append((block, False))
+
+    for block, inv in blocks:
+        if block_elimination:
+            current_formula = _eliminate(
+                block, current_formula, trace, stats, executor
+            )
+            show("", level=Verbosity.STEPS)
+        else:
+            while len(block) > 0:
+                var = ordering(block, current_formula)
+                block = [other for other in block if other is not var]
+                current_formula = _eliminate(
+                    [var], current_formula, trace, stats, executor
+                )
+                show("", level=Verbosity.STEPS)
         if inv:
             current_formula = ~current_formula
-        # current_formula = current_formula
-        show("")
+    return current_formula
 
-    show(f"Final formula : {current_formula}")
-    return compute_formula_only_constants(current_formula)
 
+def _eliminate_miniscoped(
+    closed: LogicFormula,
+    trace: Trace | None,
+    stats: DecideStats | None,
+    executor: Executor | None,
+) -> LogicFormula:
+    """
+    Eliminates all the quantifiers of a closed formula, once they are pushed inward,
+    from the innermost ones to the outermost ones.
+    """
+    with traced_stage(trace, "miniscope", closed, stats=stats) as stage:
+        stage.formula = miniscope(closed)
+    show("  (miniscoped) : {}", stage.formula, level=Verbosity.STEPS)
+
+    def eliminate_inner(node: LogicFormula, formulas: list[LogicFormula]):
+        node = node.with_sub_formulas(formulas)
+        if not isinstance(node, Quantifier):
+            return node
+        # The inner quantifiers are already eliminated
+        if node.quantifier == QuantifierType.EXISTS:
+            eliminated = _eliminate(
+                [node.variable], node.formula, trace, stats, executor
+            )
+            show("", level=Verbosity.STEPS)
+            return into_canonical_logic_formula(eliminated)
+        else:
+            # ∀x.a = ¬∃x.¬a
+            eliminated = _eliminate(
+                [node.variable], ~node.formula, trace, stats, executor
+            )
+            show("", level=Verbosity.STEPS)
+            return ~into_canonical_logic_formula(eliminated)
+
+    return fold(stage.formula, eliminate_inner, sub_formulas_of, memo={})
+
+
+def _eliminate(
+    variables: list[Variable],
+    current_formula: LogicFormula,
+    trace: Trace | None,
+    stats: DecideStats | None,
+    executor: Executor | None,
+) -> DNF:
+    """
+    Eliminates `∃variables` in front of a formula without quantifiers.
+    """
+    # Events of a block are not attached to a single variable
+    var = variables[0] if len(variables) == 1 else None
+    show(
+        "Eliminating \x1b[1;4mvariables {}\x1b[22;24m in formula {} :\n",
+        ", ".join(variable.name for variable in variables),
+        current_formula,
+        level=Verbosity.STEPS,
+    )
+    with traced_stage(trace, "NNF", current_formula, var, stats) as stage:
+        stage.formula = NNF(PNF(current_formula))
+    current_formula = stage.formula
+    show("  - NNF : {}\n", current_formula, level=Verbosity.FORMS)
+    with traced_stage(trace, "DNF", current_formula, var, stats) as stage:
+        stage.formula = DNF(current_formula)
+    current_formula = stage.formula
+    show("  - DNF : {}\n", current_formula, level=Verbosity.FORMS)
+    if (
+        executor is not None
+        and len(current_formula.formula.formulas) >= PARALLEL_MIN_CONJUNCTIONS
+    ):
+        with traced_stage(trace, "elim_parallel", current_formula, var, stats) as stage:
+            stage.formula, contradictions = elim_parallel(
+                variables, current_formula, executor
+            )
+        if stats is not None:
+            stats.contradictions += contradictions
+    elif var is not None:
+        with traced_stage(trace, "elim_variable", current_formula, var, stats) as stage:
+            stage.formula = elim_variable(var, current_formula, stats)
+    else:
+        with traced_stage(trace, "elim_variables", current_formula, None, stats) as stage:
+            stage.formula = elim_variables(variables, current_formula, stats)
+    return stage.formula
+
+
+def elim_variables(
+    variables: Iterable[IntoVariable], f: DNF, stats: DecideStats | None = None
+) -> DNF:
+    """
+    Eliminates several `Variable`s at once in a `DNF`, by projecting the order graph of each conjunction
+    onto the other terms (see `OrderGraph.project`, and `project_matrix` for big conjunctions if `numpy` is installed).
 
-def elim_variable(var: IntoVariable, f: DNF) -> DNF:
+    If a `DecideStats` is given, the contradictory conjunctions that are dropped are counted in it.
+    """
+    eliminated = [into_variable(var) for var in variables]
+    formulas: set[FormulaSet | LogicFormula] = set()
+    for conj in f.formula.iter_formulas():
+        assert type(conj) is FormulaSet
+        for form in conj.iter_formulas():
+            assert isinstance(form, (Comp, BoolConst)), (
+                f"The DNF contained something else than comparisons and boolean constants : {form}"
+            )
+        if prefers_matrix(conj):
+            projected = project_matrix(conj.iter_formulas(), eliminated)
+        else:
+            graph = OrderGraph(conj.iter_formulas())
+            projected = graph.project(eliminated) if graph.is_satisfiable() else None
+        if projected is None:
+            if stats is not None:
+                stats.contradictions += 1
+            continue
+        formulas.add(projected)
+    return DNF(FormulaSet(formulas, BoolOpType.DISJ))
+
+
+def elim_variable(
+    var: IntoVariable, f: DNF, stats: DecideStats | None = None
+) -> DNF:
     """
     Eliminates a `Variable` in a `DNF`.
+
+    If a `DecideStats` is given, the contradictory conjunctions that are dropped are counted in it.
     """
     var = into_variable(var)
     # Now that the formula is in DNF, we assume the current exisential quantifier applies to each member of the DNF.
@@ -83,6 +331,8 @@ def elim_variable(var: IntoVariable, f: DNF) -> DNF:
                     # var < var or False are in the conjunction, we insert False (we could theoretically skip inserting)
                     new_dnf.formulas.add(BoolConst(False))
                     end = True
+            if end and stats is not None:
+                stats.contradictions += 1
 
         if not end:
             # x < var
@@ -125,16 +375,11 @@ def elim_variable(var: IntoVariable, f: DNF) -> DNF:
                     )
 
             if len(var_equals.formulas) > 0:
-                # We can replace all instances of the current variable with the found variable
-                first_equality = var_equals.iter_formulas().__next__()
-                assert isinstance(first_equality, Comp)
-                new_var = into_variable(first_equality.expr2)
-                assert not new_var.is_syntaxically_eq(var)
-
+                # var is equal to other terms : all the equalities are merged into classes,
+                # and var is replaced by the representative of its class in every atom
                 new_dnf.formulas.add(
-                    flatten_conj(
-                        (var_on_lhs & var_on_rhs & var_equals)[var:new_var]
-                        & var_not_present
+                    EqualityClasses(conj.iter_formulas()).rewrite(
+                        conj.iter_formulas(), var
                     )
                 )
             elif len(var_on_lhs.formulas) > 0 and len(var_on_rhs.formulas) > 0:
@@ -149,24 +394,26 @@ def elim_variable(var: IntoVariable, f: DNF) -> DNF:
                 new_dnf.formulas.add(var_not_present)
 
     # Tiny optimization on dnf to remove boolean constants
-    formulas: set[FormulaSet | LogicFormula] = set(
-        FormulaSet(
-            set(
-                [
+    formulas: set[FormulaSet | LogicFormula] = set()
+    for conj in new_dnf.formulas:
+        if not isinstance(conj, FormulaSet):
+            # False, already counted
+            continue
+        if not is_satisfiable(conj.iter_formulas()):
+            # Contains False, or comparisons that contradict each other (x < y ∧ y < z ∧ z < x)
+            if stats is not None:
+                stats.contradictions += 1
+            continue
+        formulas.add(
+            FormulaSet(
+                set(
                     form
                     for form in conj.iter_formulas()
                     if not isinstance(form, BoolConst)
-                ]
-            ),
-            BoolOpType.CONJ,
+                ),
+                BoolOpType.CONJ,
+            )
         )
-        for conj in new_dnf.formulas
-        if isinstance(conj, FormulaSet)
-        and not any(
-            isinstance(form, BoolConst) and BoolConst(False).is_syntaxically_eq(form)
-            for form in conj.iter_formulas()
-        )
-    )
 
     new_dnf.formulas = formulas
     return DNF(new_dnf)
@@ -0,0 +1,118 @@
+"""
+Classes of terms made equal by the `=` atoms of a conjunction.
+"""
+
+from typing import Any, Iterable
+
+from formula.boolconst import BoolConst
+from formula.boolop import BoolOpType
+from formula.comp import Comp, CompType
+from formula.formula_set import FormulaSet
+from formula.numconst import NumConst
+from formula.types import ArithExpression, LogicFormula
+from formula.variable import Variable
+
+
+def term_key(term: ArithExpression) -> tuple[int, Any]:
+    """
+    Orders the terms (number constants by value, then variables by name), so that the representatives
+    of the classes don’t depend on the order in which the atoms of a set are visited.
+    """
+    if isinstance(term, NumConst):
+        return (0, term.const)
+    elif isinstance(term, Variable):
+        return (1, term.name)
+    return (2, repr(term))
+
+
+class UnionFind:
+    """
+    Classes of terms, identified by their `id` (terms are hash-consed).
+    """
+
+    __slots__ = ("parent",)
+
+    def __init__(self) -> None:
+        self.parent: dict[int, int] = {}
+
+    def find(self, term: int) -> int:
+        parent = self.parent.get(term, term)
+        while parent != term:
+            # Path halving
+            grandparent = self.parent.get(parent, parent)
+            self.parent[term] = grandparent
+            term = grandparent
+            parent = self.parent.get(term, term)
+        return term
+
+    def union(self, lhs: int, rhs: int) -> None:
+        lhs, rhs = self.find(lhs), self.find(rhs)
+        if lhs != rhs:
+            self.parent[lhs] = rhs
+
+
+class EqualityClasses:
+    """
+    The classes of the terms of a conjunction, merged in one pass over its `=` atoms.
+    """
+
+    __slots__ = ("classes", "terms")
+
+    def __init__(self, conj: Iterable[LogicFormula]) -> None:
+        self.classes = UnionFind()
+        # The terms of the equalities, by `id`
+        self.terms: dict[int, ArithExpression] = {}
+        for literal in conj:
+            if isinstance(literal, Comp) and literal.comp == CompType.EQUAL:
+                self.terms[id(literal.expr1)] = literal.expr1
+                self.terms[id(literal.expr2)] = literal.expr2
+                self.classes.union(id(literal.expr1), id(literal.expr2))
+
+    def representatives(
+        self, avoid: Variable | None = None
+    ) -> dict[int, ArithExpression]:
+        """
+        Chooses a representative in each class (the first one according to `term_key`, other than `avoid`
+        if the class has other terms), and gives it for the `id` of each term of the class.
+        """
+        chosen: dict[int, ArithExpression] = {}
+        for key, term in self.terms.items():
+            root = self.classes.find(key)
+            current = chosen.get(root)
+            if (
+                current is None
+                or current is avoid
+                or term is not avoid
+                and term_key(term) < term_key(current)
+            ):
+                chosen[root] = term
+        return {key: chosen[self.classes.find(key)] for key in self.terms}
+
+    def rewrite(
+        self, conj: Iterable[LogicFormula], avoid: Variable | None = None
+    ) -> FormulaSet:
+        """
+        Rewrites a conjunction with the representatives of the classes :
+        each other term `t` of a class gives `t = representative`, and each `a < b` is rewritten between representatives.
+
+        `avoid` disappears from the conjunction if its class has other terms, which eliminates `∃avoid`.
+        """
+        representatives = self.representatives(avoid)
+        literals: set[LogicFormula] = set()
+        for key, term in self.terms.items():
+            representative = representatives[key]
+            if term is not representative and term is not avoid:
+                literals.add(Comp(term, CompType.EQUAL, representative))
+        for literal in conj:
+            if isinstance(literal, Comp):
+                if literal.comp == CompType.LOWER_THAN:
+                    literals.add(
+                        Comp(
+                            representatives.get(id(literal.expr1), literal.expr1),
+                            CompType.LOWER_THAN,
+                            representatives.get(id(literal.expr2), literal.expr2),
+                        )
+                    )
+            elif not (isinstance(literal, BoolConst) and literal.const):
+                literals.add(literal)
+        return FormulaSet(literals, BoolOpType.CONJ)
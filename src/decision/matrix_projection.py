@@ -0,0 +1,144 @@
+"""
+Projection of conjunctions of comparisons with boolean NumPy matrices.
+
+This engine is optional : `HAS_NUMPY` is `False` when `numpy` is not installed,
+and `elim_variables` then only uses `OrderGraph.project`.
+"""
+
+from typing import Collection, Iterable
+
+from decision.equalities import term_key
+from formula.boolconst import BoolConst
+from formula.boolop import BoolOpType
+from formula.comp import Comp, CompType
+from formula.formula_set import FormulaSet
+from formula.numconst import NumConst
+from formula.types import ArithExpression, LogicFormula
+from formula.variable import Variable
+
+try:
+    import numpy as np
+
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# `project_matrix` is only faster than `OrderGraph.project` on big and dense conjunctions,
+# with at least `MATRIX_MIN_ATOMS` atoms and `MATRIX_MIN_DENSITY × terms²` atoms (see `src/bench_matrix.py`)
+MATRIX_MIN_ATOMS = 200
+MATRIX_MIN_DENSITY = 1 / 16
+
+
+def prefers_matrix(conj: FormulaSet) -> bool:
+    """
+    Tells if `project_matrix` should be used for a conjunction (always `False` without `numpy`).
+    """
+    atoms = len(conj.formulas)
+    if not HAS_NUMPY or atoms < MATRIX_MIN_ATOMS:
+        return False
+    terms = {id(term) for literal in conj.formulas for term in literal.children()}
+    return atoms >= MATRIX_MIN_DENSITY * len(terms) ** 2
+
+
+def _product(lhs: "np.ndarray", rhs: "np.ndarray") -> "np.ndarray":
+    """
+    Product of boolean matrices (computed with floats, whose product is much faster).
+    """
+    return (lhs.astype(np.float32) @ rhs.astype(np.float32)) > 0
+
+
+def _closure(relation: "np.ndarray") -> "np.ndarray":
+    """
+    Reflexive and transitive closure of a boolean matrix, by repeated squaring.
+    """
+    closure = relation | np.eye(len(relation), dtype=bool)
+    while True:
+        squared = _product(closure, closure)
+        if (squared == closure).all():
+            return closure
+        closure = squared
+
+
+def project_matrix(
+    conj: Iterable[LogicFormula], variables: Collection[Variable]
+) -> FormulaSet | None:
+    """
+    Same as `OrderGraph(conj).project(variables)`, or `None` if the conjunction is unsatisfiable.
+
+    The terms are the rows and columns of a matrix of `≤` (the `<` and `=` atoms) : its closure gives
+    the equal terms (`a ≤ b` and `b ≤ a`) and the strict order (a path with a `<`), which is unsatisfiable
+    when it has a term on its diagonal. The projection keeps the transitive reduction of the order between
+    the classes of the other terms.
+    """
+    terms: list[ArithExpression] = []
+    indices: dict[int, int] = {}
+    strict: list[tuple[int, int]] = []
+    equal: list[tuple[int, int]] = []
+
+    def index(term: ArithExpression) -> int:
+        known = indices.get(id(term))
+        if known is None:
+            known = indices[id(term)] = len(terms)
+            terms.append(term)
+        return known
+
+    for literal in conj:
+        if isinstance(literal, BoolConst):
+            if not literal.const:
+                return None
+        elif isinstance(literal, Comp):
+            pair = (index(literal.expr1), index(literal.expr2))
+            (equal if literal.comp == CompType.EQUAL else strict).append(pair)
+
+    # Number constants are ordered by their values
+    constants = sorted(
+        (term.const, i) for i, term in enumerate(terms) if isinstance(term, NumConst)
+    )
+    for (lower_value, lower), (upper_value, upper) in zip(constants, constants[1:]):
+        (equal if lower_value == upper_value else strict).append((lower, upper))
+
+    size = len(terms)
+    lower_than = np.zeros((size, size), dtype=bool)
+    lower_or_equal = np.zeros((size, size), dtype=bool)
+    if strict:
+        lhs, rhs = zip(*strict)
+        lower_than[lhs, rhs] = True
+        lower_or_equal[lhs, rhs] = True
+    if equal:
+        lhs, rhs = zip(*equal)
+        lower_or_equal[lhs, rhs] = True
+        lower_or_equal[rhs, lhs] = True
+
+    closure = _closure(lower_or_equal)
+    order = _product(_product(closure, lower_than), closure)
+    if order.diagonal().any():
+        return None
+
+    eliminated = {id(variable) for variable in variables}
+    kept = np.array(
+        sorted(
+            (i for i, term in enumerate(terms) if id(term) not in eliminated),
+            key=lambda i: term_key(terms[i]),
+        ),
+        dtype=int,
+    )
+    literals: set[LogicFormula] = set()
+    if len(kept) == 0:
+        return FormulaSet(literals, BoolOpType.CONJ)
+
+    # The representative of each kept term is the first kept term of its class according to `term_key`
+    same_class = (closure & closure.T)[np.ix_(kept, kept)]
+    representatives = kept[same_class.argmax(axis=1)]
+    for term, representative in zip(kept, representatives):
+        if term != representative:
+            literals.add(Comp(terms[term], CompType.EQUAL, terms[representative]))
+
+    classes = np.unique(representatives)
+    kept_order = order[np.ix_(classes, classes)]
+    # Pairs of classes with another class between them are implied by the others
+    reduced = kept_order & ~_product(kept_order, kept_order)
+    for lower, upper in zip(*np.nonzero(reduced)):
+        lhs, rhs = terms[classes[lower]], terms[classes[upper]]
+        if not (isinstance(lhs, NumConst) and isinstance(rhs, NumConst)):
+            literals.add(Comp(lhs, CompType.LOWER_THAN, rhs))
+    return FormulaSet(literals, BoolOpType.CONJ)
@@ -0,0 +1,151 @@
+"""
+Satisfiability of conjunctions of comparisons, through their order graph.
+
+The terms of the conjunction are the vertices, `a = b` merges `a` and `b` (with a union-find)
+and `a < b` is a strict edge from `a` to `b`. In a dense linear order without endpoints,
+a conjunction of comparisons is satisfiable exactly when this graph has no cycle.
+"""
+
+from typing import Collection, Iterable
+
+from decision.equalities import UnionFind, term_key
+from formula.boolconst import BoolConst
+from formula.boolop import BoolOpType
+from formula.comp import Comp, CompType
+from formula.formula_set import FormulaSet
+from formula.numconst import NumConst
+from formula.types import ArithExpression, LogicFormula
+from formula.variable import Variable
+
+
+def _has_cycle(successors: dict[int, list[int]]) -> bool:
+    """
+    Iterative depth-first search, that visits each vertex and each edge once.
+    """
+    # Vertices absent are not visited yet, `False` are on the current path, `True` are done
+    done: dict[int, bool] = {}
+    for root in successors:
+        if root in done:
+            continue
+        done[root] = False
+        stack = [(root, iter(successors[root]))]
+        while stack:
+            vertex, remaining = stack[-1]
+            for successor in remaining:
+                state = done.get(successor)
+                if state is None:
+                    done[successor] = False
+                    stack.append((successor, iter(successors.get(successor, ()))))
+                    break
+                elif not state:
+                    return True
+            else:
+                done[vertex] = True
+                stack.pop()
+    return False
+
+
+class OrderGraph:
+    """
+    The order graph of a conjunction of comparisons and boolean constants.
+
+    Its vertices are the classes of equal terms (identified by the `id` of a term of the class)
+    and its edges are the `<` between them. Number constants are ordered by their values.
+    Other literals are ignored.
+    """
+
+    __slots__ = ("classes", "terms", "successors", "contradictory")
+
+    def __init__(self, conj: Iterable[LogicFormula]) -> None:
+        self.classes = UnionFind()
+        # All the terms of the comparisons, by `id`
+        self.terms: dict[int, ArithExpression] = {}
+        self.successors: dict[int, list[int]] = {}
+        # Contains `⊥` or `x < x` (once equal terms are merged)
+        self.contradictory = False
+
+        strict: list[tuple[int, int]] = []
+        constants: dict[int | float, int] = {}
+        for literal in conj:
+            if isinstance(literal, BoolConst):
+                if not literal.const:
+                    self.contradictory = True
+            elif isinstance(literal, Comp):
+                lhs, rhs = literal.expr1, literal.expr2
+                for term in (lhs, rhs):
+                    self.terms[id(term)] = term
+                    if isinstance(term, NumConst):
+                        # `1` and `1.0` are the same number
+                        self.classes.union(
+                            id(term), constants.setdefault(term.const, id(term))
+                        )
+                if literal.comp == CompType.EQUAL:
+                    self.classes.union(id(lhs), id(rhs))
+                else:
+                    strict.append((id(lhs), id(rhs)))
+
+        ordered = sorted(constants)
+        strict.extend(
+            (constants[lower], constants[upper])
+            for lower, upper in zip(ordered, ordered[1:])
+        )
+        for lhs, rhs in strict:
+            lhs, rhs = self.classes.find(lhs), self.classes.find(rhs)
+            if lhs == rhs:
+                self.contradictory = True
+            self.successors.setdefault(lhs, []).append(rhs)
+
+    def is_satisfiable(self) -> bool:
+        """
+        In a dense linear order without endpoints, the conjunction is satisfiable exactly when the graph has no cycle.
+        """
+        return not self.contradictory and not _has_cycle(self.successors)
+
+    def project(self, variables: Collection[Variable]) -> FormulaSet:
+        """
+        The conjunction of comparisons between the other terms that is equivalent to `∃variables` in front of
+        the (satisfiable) conjunction.
+
+        Two kept terms `a` and `b` give `a < b` when there is a path from `a` to `b` whose inner vertices are all eliminated.
+        """
+        eliminated = {id(variable) for variable in variables}
+        # The first kept term of each class according to `term_key`
+        representatives: dict[int, ArithExpression] = {}
+        for key, term in self.terms.items():
+            if key not in eliminated:
+                root = self.classes.find(key)
+                current = representatives.get(root)
+                if current is None or term_key(term) < term_key(current):
+                    representatives[root] = term
+
+        literals: set[LogicFormula] = set()
+        for key, term in self.terms.items():
+            if key not in eliminated:
+                representative = representatives[self.classes.find(key)]
+                if term is not representative:
+                    literals.add(Comp(term, CompType.EQUAL, representative))
+
+        for root, lower in representatives.items():
+            # Depth-first search through the eliminated classes
+            visited = {root}
+            stack = list(self.successors.get(root, ()))
+            while stack:
+                vertex = stack.pop()
+                if vertex in visited:
+                    continue
+                visited.add(vertex)
+                upper = representatives.get(vertex)
+                if upper is None:
+                    stack.extend(self.successors.get(vertex, ()))
+                elif not (isinstance(lower, NumConst) and isinstance(upper, NumConst)):
+                    literals.add(Comp(lower, CompType.LOWER_THAN, upper))
+        return FormulaSet(literals, BoolOpType.CONJ)
+
+
+def is_satisfiable(conj: Iterable[LogicFormula]) -> bool:
+    """
+    Tells if a conjunction of comparisons and boolean constants is satisfiable (see `OrderGraph`).
+
+    Other literals are ignored (so the conjunction may be unsatisfiable even if `True` is returned).
+    """
+    return OrderGraph(conj).is_satisfiable()
@@ -0,0 +1,85 @@
+"""
+Strategies to choose the order in which the variables of a block of quantifiers are eliminated.
+
+Inside a block of consecutive `∃` quantifiers the order doesn’t change the result,
+but eliminating a variable with `m` lower bounds and `n` upper bounds gives `m·n` comparisons.
+"""
+
+from typing import Callable
+
+from formula.boolop import BoolOp
+from formula.comp import Comp, CompType
+from formula.forms import Form
+from formula.formula_set import FormulaSet
+from formula.notb import Not
+from formula.traversal import iter_nodes
+from formula.types import LogicFormula
+from formula.variable import Variable
+
+# Chooses the next variable to eliminate among `variables` (never empty), in the formula
+type OrderingStrategy = Callable[[list[Variable], LogicFormula], Variable]
+
+# Number of comparisons that give a lower bound and an upper bound to each variable
+type Bounds = dict[Variable, tuple[int, int]]
+
+
+def given_order(variables: list[Variable], formula: LogicFormula) -> Variable:
+    """
+    Eliminates the variables in the order of the quantifiers (innermost first).
+    """
+    return variables[0]
+
+
+def _add_bounds(bounds: Bounds, lower: int, upper: int, variable: Variable) -> None:
+    known_lower, known_upper = bounds.get(variable, (0, 0))
+    bounds[variable] = (known_lower + lower, known_upper + upper)
+
+
+def count_bounds(formula: LogicFormula) -> Bounds:
+    """
+    Counts, for each variable, the comparisons of the formula that would give it a lower bound and an upper bound
+    once the formula is in negation normal form (`¬(a < b)` is `a = b ∨ b < a` and `¬(a = b)` is `a < b ∨ b < a`).
+
+    Comparisons are counted as many times as they appear.
+    """
+    type Position = tuple[LogicFormula, bool]
+
+    def bounds_children(position: Position) -> tuple[Position, ...]:
+        node, positive = position
+        if isinstance(node, Not):
+            return ((node.formula, not positive),)
+        elif isinstance(node, (BoolOp, Form, FormulaSet)):
+            # Normal forms are read directly, without converting them into `BoolOp`s
+            return tuple((child, positive) for child in node.children())
+        return ()
+
+    bounds: Bounds = {}
+    for node, positive in iter_nodes((formula, True), bounds_children):
+        if not isinstance(node, Comp):
+            continue
+        lhs, rhs = node.expr1, node.expr2
+        if isinstance(lhs, Variable) and isinstance(rhs, Variable):
+            if node.comp == CompType.LOWER_THAN:
+                # a < b, or b < a (and a = b) when negated
+                lower_side, upper_side = (lhs, rhs) if positive else (rhs, lhs)
+                _add_bounds(bounds, 0, 1, lower_side)
+                _add_bounds(bounds, 1, 0, upper_side)
+            elif not positive:
+                # a < b ∨ b < a
+                _add_bounds(bounds, 1, 1, lhs)
+                _add_bounds(bounds, 1, 1, rhs)
+    return bounds
+
+
+def min_bound_product(variables: list[Variable], formula: LogicFormula) -> Variable:
+    """
+    Eliminates first the variable with the fewest `lower bounds × upper bounds` (see `count_bounds`),
+    the ones that appear first in `variables` on a tie.
+    """
+    bounds = count_bounds(formula)
+
+    def cost(variable: Variable) -> int:
+        lower, upper = bounds.get(variable, (0, 0))
+        return lower * upper
+
+    return min(variables, key=cost)
@@ -0,0 +1,165 @@
+"""
+Elimination of variables in the conjunctions of a `DNF` with several processes (see the `workers` argument of `decide`).
+
+`∃` distributes over `∨`, so each conjunction is eliminated independently. The conjunctions are sent
+to the processes in chunks, encoded as arrays of integers over tables of terms and atoms,
+which are much smaller and faster to pickle than formula nodes.
+"""
+
+from array import array
+from concurrent.futures import Executor
+
+from formula.boolconst import BoolConst
+from formula.boolop import BoolOpType
+from formula.comp import Comp, CompType
+from formula.forms import DNF
+from formula.formula_set import FormulaSet
+from formula.numconst import NumConst
+from formula.types import ArithExpression, LogicFormula
+from formula.variable import Variable
+
+# Smaller DNFs are eliminated in the current process, the transfers would cost more than the elimination
+PARALLEL_MIN_CONJUNCTIONS = 2000
+# Number of conjunctions sent to a worker at once (there are several chunks per worker, so that a slow chunk
+# doesn’t leave the other workers idle)
+CHUNK_SIZE = 500
+
+# Variables are sent by name, number constants by value, other terms as they are
+type EncodedTerm = str | int | float | ArithExpression
+# The table of the terms, the atoms (3 integers each : `(0, lhs, rhs)` for `lhs = rhs`, `(1, lhs, rhs)`
+# for `lhs < rhs` and `(2, const, 0)` for a boolean constant, the terms being indices in the table),
+# the indices of the atoms of all the conjunctions one after the other, and where each conjunction ends
+type EncodedChunk = tuple[list[EncodedTerm], array[int], array[int], array[int]]
+
+_ATOM_KINDS = {CompType.EQUAL: 0, CompType.LOWER_THAN: 1}
+_COMP_TYPES = [CompType.EQUAL, CompType.LOWER_THAN]
+
+
+def encode_conjunctions(conjs: list[FormulaSet]) -> EncodedChunk:
+    """
+    Encodes conjunctions of comparisons and boolean constants.
+
+    Conjunctions share most of their atoms, so each atom is encoded once.
+    """
+    table: list[EncodedTerm] = []
+    term_indices: dict[int, int] = {}
+    atoms = array("i")
+    atom_indices: dict[int, int] = {}
+
+    def term_index(term: ArithExpression) -> int:
+        known = term_indices.get(id(term))
+        if known is None:
+            known = term_indices[id(term)] = len(table)
+            if isinstance(term, Variable):
+                table.append(term.name)
+            elif isinstance(term, NumConst):
+                table.append(term.const)
+            else:
+                table.append(term)
+        return known
+
+    def atom_index(atom: LogicFormula) -> int:
+        known = atom_indices.get(id(atom))
+        if known is None:
+            known = atom_indices[id(atom)] = len(atoms) // 3
+            if isinstance(atom, Comp):
+                atoms.extend(
+                    (
+                        _ATOM_KINDS[atom.comp],
+                        term_index(atom.expr1),
+                        term_index(atom.expr2),
+                    )
+                )
+            elif isinstance(atom, BoolConst):
+                atoms.extend((2, int(atom.const), 0))
+            else:
+                raise TypeError(f"Cannot encode literal {atom}")
+        return known
+
+    literals = array("I")
+    ends = array("I")
+    for conj in conjs:
+        literals.extend(atom_index(atom) for atom in conj.iter_formulas())
+        ends.append(len(literals))
+    if len(atoms) // 3 <= 0xFFFF:
+        # Half the size
+        literals = array("H", literals)
+    return (table, atoms, literals, ends)
+
+
+def decode_conjunctions(chunk: EncodedChunk) -> list[FormulaSet]:
+    """
+    Decodes conjunctions encoded by `encode_conjunctions`.
+    """
+    table, encoded_atoms, literals, ends = chunk
+    terms = [
+        Variable(term)
+        if isinstance(term, str)
+        else NumConst(term)
+        if isinstance(term, (int, float))
+        else term
+        for term in table
+    ]
+    atoms: list[LogicFormula] = []
+    for i in range(0, len(encoded_atoms), 3):
+        kind, lhs, rhs = encoded_atoms[i : i + 3]
+        if kind == 2:
+            atoms.append(BoolConst(bool(lhs)))
+        else:
+            atoms.append(Comp(terms[lhs], _COMP_TYPES[kind], terms[rhs]))
+    conjs: list[FormulaSet] = []
+    start = 0
+    for end in ends:
+        conjs.append(
+            FormulaSet({atoms[i] for i in literals[start:end]}, BoolOpType.CONJ)
+        )
+        start = end
+    return conjs
+
+
+def _eliminate_chunk(
+    variables: list[str], chunk: EncodedChunk
+) -> tuple[EncodedChunk, int]:
+    """
+    Runs in a worker : eliminates the variables in the conjunctions of a chunk,
+    and gives the encoded resulting conjunctions with the number of contradictory ones.
+    """
+    from decision.elim import elim_variable, elim_variables
+    from decision.stats import DecideStats
+
+    stats = DecideStats()
+    dnf = DNF(FormulaSet(set(decode_conjunctions(chunk)), BoolOpType.DISJ))
+    if len(variables) == 1:
+        dnf = elim_variable(Variable(variables[0]), dnf, stats)
+    else:
+        dnf = elim_variables([Variable(name) for name in variables], dnf, stats)
+    conjs = [conj for conj in dnf.formula.iter_formulas()]
+    return (encode_conjunctions(conjs), stats.contradictions)  # type: ignore
+
+
+def elim_parallel(
+    variables: list[Variable], f: DNF, executor: Executor
+) -> tuple[DNF, int]:
+    """
+    Eliminates `∃variables` in front of a `DNF` with an executor of processes.
+
+    Returns the resulting `DNF` (whose conjunctions are deduplicated) and the number of contradictory conjunctions.
+    """
+    conjs = [conj for conj in f.formula.iter_formulas()]
+    names = [variable.name for variable in variables]
+    futures = [
+        executor.submit(
+            _eliminate_chunk,
+            names,
+            encode_conjunctions(conjs[i : i + CHUNK_SIZE]),  # type: ignore
+        )
+        for i in range(0, len(conjs), CHUNK_SIZE)
+    ]
+
+    formulas: set[FormulaSet | LogicFormula] = set()
+    contradictions = 0
+    for future in futures:
+        chunk, chunk_contradictions = future.result()
+        formulas.update(decode_conjunctions(chunk))
+        contradictions += chunk_contradictions
+    return (DNF(FormulaSet(formulas, BoolOpType.DISJ)), contradictions)
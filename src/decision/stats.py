@@ -0,0 +1,121 @@
+"""
+Statistics of a call to `decide` (see its `stats` argument).
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from decision.trace import formula_size
+from formula.forms import DNF, PRUNING_COUNTERS
+from formula.types import (
+    CALL_COUNTERS,
+    NODE_COUNTERS,
+    LogicFormula,
+    counting_calls,
+)
+
+
+class DecideStats:
+    """
+    Statistics filled by `decide(f, stats=stats)`.
+
+    - `times` : the time (in seconds) spent in each stage (`PNF`, `all_exists`, `NNF`, `DNF`, `elim_variable`,
+      `elim_variables` and `elim_parallel`).
+    - `total_time` : the time spent in the whole `decide`.
+    - `max_dnf_conjunctions` and `max_dnf_atoms` : the size of the largest intermediate DNF.
+    - `constructed_nodes` and `allocated_nodes` : the number of formula nodes built during the call
+      (`allocated_nodes` only counts the ones that didn’t exist yet, see `NODE_COUNTERS`).
+    - `hashes` and `equalities` : the number of calls to `__hash__` and `is_syntaxically_eq` on formula nodes.
+    - `contradictions` : the number of conjunctions dropped by the DNF conversions and `elim_variable(s)`
+      because they were contradictory.
+    - `cache_hits` : the number of results read from a `DecideCache` instead of being computed.
+    """
+
+    def __init__(self) -> None:
+        self.times: dict[str, float] = {}
+        self.total_time = 0.0
+        self.max_dnf_conjunctions = 0
+        self.max_dnf_atoms = 0
+        self.constructed_nodes = 0
+        self.allocated_nodes = 0
+        self.hashes = 0
+        self.equalities = 0
+        self.contradictions = 0
+        self.cache_hits = 0
+
+    @contextmanager
+    def measure(self) -> Iterator[None]:
+        """
+        Measures the whole call to `decide`.
+        """
+        hashes = CALL_COUNTERS["hashes"]
+        equalities = CALL_COUNTERS["equalities"]
+        constructions = NODE_COUNTERS["constructions"]
+        allocations = NODE_COUNTERS["allocations"]
+        contradictions = PRUNING_COUNTERS["contradictions"]
+        start = time.perf_counter()
+        try:
+            with counting_calls():
+                yield
+        finally:
+            self.total_time += time.perf_counter() - start
+            self.constructed_nodes += NODE_COUNTERS["constructions"] - constructions
+            self.allocated_nodes += NODE_COUNTERS["allocations"] - allocations
+            self.hashes += CALL_COUNTERS["hashes"] - hashes
+            self.equalities += CALL_COUNTERS["equalities"] - equalities
+            self.contradictions += PRUNING_COUNTERS["contradictions"] - contradictions
+
+    def add_stage(self, name: str, duration: float, formula: LogicFormula) -> None:
+        """
+        Adds a stage that took `duration` seconds and gave `formula`.
+        """
+        self.times[name] = self.times.get(name, 0.0) + duration
+        if isinstance(formula, DNF):
+            conjunctions, atoms = formula_size(formula)
+            assert conjunctions is not None
+            self.max_dnf_conjunctions = max(self.max_dnf_conjunctions, conjunctions)
+            self.max_dnf_atoms = max(self.max_dnf_atoms, atoms)
+
+    def merge(self, other: "DecideStats") -> None:
+        """
+        Adds the statistics of another call (the sizes of the largest DNFs are the largest of both).
+        """
+        for name, duration in other.times.items():
+            self.times[name] = self.times.get(name, 0.0) + duration
+        self.total_time += other.total_time
+        self.max_dnf_conjunctions = max(
+            self.max_dnf_conjunctions, other.max_dnf_conjunctions
+        )
+        self.max_dnf_atoms = max(self.max_dnf_atoms, other.max_dnf_atoms)
+        self.constructed_nodes += other.constructed_nodes
+        self.allocated_nodes += other.allocated_nodes
+        self.hashes += other.hashes
+        self.equalities += other.equalities
+        self.contradictions += other.contradictions
+        self.cache_hits += other.cache_hits
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "times": dict(self.times),
+            "total_time": self.total_time,
+            "max_dnf_conjunctions": self.max_dnf_conjunctions,
+            "max_dnf_atoms": self.max_dnf_atoms,
+            "constructed_nodes": self.constructed_nodes,
+            "allocated_nodes": self.allocated_nodes,
+            "hashes": self.hashes,
+            "equalities": self.equalities,
+            "contradictions": self.contradictions,
+            "cache_hits": self.cache_hits,
+        }
+
+    @classmethod
+    def from_dict(cls, values: dict[str, Any]) -> "DecideStats":
+        """
+        The opposite of `to_dict`.
+        """
+        stats = cls()
+        for name, value in values.items():
+            if hasattr(stats, name):
+                setattr(stats, name, dict(value) if name == "times" else value)
+        return stats
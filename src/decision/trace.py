@@ -0,0 +1,215 @@
+"""
+Structured trace of the stages of `decide`.
+
+Each stage (PNF, `all_exists`, NNF and DNF conversions, `elim_variable`) gives a `TraceEvent`,
+which can be written as JSON Lines or in the Chrome `trace_event` format (to open a run in a trace viewer).
+"""
+
+import json
+import os
+import time
+import tracemalloc
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from typing import TYPE_CHECKING, Any, Iterator
+
+from formula.boolconst import BoolConst
+from formula.comp import Comp
+from formula.formula_set import FormulaSet
+from formula.forms import DNF
+from formula.traversal import fold
+from formula.types import LogicFormula
+from formula.variable import Variable
+
+if TYPE_CHECKING:
+    from decision.stats import DecideStats
+
+
+def formula_size(f: LogicFormula) -> tuple[int | None, int]:
+    """
+    Returns the number of conjunctions (only for a `DNF`, else `None`) and the number of atoms of a formula.
+
+    Atoms are comparisons and boolean constants, counted as many times as they appear.
+    """
+    if isinstance(f, DNF):
+        conjunctions = [
+            conj for conj in f.formula.formulas if isinstance(conj, FormulaSet)
+        ]
+        return (
+            len(f.formula.formulas),
+            sum(len(conj.formulas) for conj in conjunctions)
+            + len(f.formula.formulas)
+            - len(conjunctions),
+        )
+
+    def count_atoms(node: Any, counts: list[int]) -> int:
+        if isinstance(node, Comp) or isinstance(node, BoolConst):
+            return 1
+        return sum(counts)
+
+    # Arithmetic expressions are not visited
+    return (
+        None,
+        fold(
+            f,
+            count_atoms,
+            lambda node: () if isinstance(node, Comp) else node.children(),
+            memo={},
+        ),
+    )
+
+
+class TraceEvent:
+    """
+    A stage of `decide` : its name, the eliminated variable (if any), the size of the formula before and after,
+    when it started, how long it took (in seconds) and the peak memory it allocated (in bytes).
+    """
+
+    __slots__ = (
+        "name",
+        "variable",
+        "conjunctions_before",
+        "atoms_before",
+        "conjunctions_after",
+        "atoms_after",
+        "start",
+        "duration",
+        "peak_memory",
+    )
+
+    def __init__(self, name: str, variable: Variable | None) -> None:
+        self.name = name
+        self.variable = variable
+        self.conjunctions_before: int | None = None
+        self.atoms_before = 0
+        self.conjunctions_after: int | None = None
+        self.atoms_after = 0
+        self.start = 0.0
+        self.duration = 0.0
+        self.peak_memory = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "variable": None if self.variable is None else self.variable.name,
+            "conjunctions_before": self.conjunctions_before,
+            "atoms_before": self.atoms_before,
+            "conjunctions_after": self.conjunctions_after,
+            "atoms_after": self.atoms_after,
+            "start": self.start,
+            "duration": self.duration,
+            "peak_memory": self.peak_memory,
+        }
+
+
+class StageResult:
+    """
+    Given by `Trace.stage` : the stage sets `formula` to its result.
+    """
+
+    __slots__ = ("formula",)
+
+    def __init__(self, formula: LogicFormula) -> None:
+        self.formula = formula
+
+
+class Trace:
+    """
+    The list of the `TraceEvent`s of one or several calls to `decide` (see the `trace` argument).
+    """
+
+    def __init__(self) -> None:
+        self.events: list[TraceEvent] = []
+        self.origin = time.perf_counter()
+
+    @contextmanager
+    def stage(
+        self, name: str, formula: LogicFormula, variable: Variable | None = None
+    ) -> Iterator[StageResult]:
+        """
+        Records a stage that transforms `formula` into `result.formula`.
+        """
+        event = TraceEvent(name, variable)
+        event.conjunctions_before, event.atoms_before = formula_size(formula)
+        result = StageResult(formula)
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield result
+        finally:
+            end = time.perf_counter()
+            event.peak_memory = tracemalloc.get_traced_memory()[1] - current
+            if started_tracing:
+                tracemalloc.stop()
+            event.start = start - self.origin
+            event.duration = end - start
+            event.conjunctions_after, event.atoms_after = formula_size(result.formula)
+            self.events.append(event)
+
+    def write_jsonl(self, path: str) -> None:
+        """
+        Writes the events as JSON Lines (one JSON object per event).
+        """
+        with open(path, "w") as file:
+            for event in self.events:
+                file.write(json.dumps(event.to_dict()) + "\n")
+
+    def write_chrome(self, path: str) -> None:
+        """
+        Writes the events in the Chrome `trace_event` format (readable by `chrome://tracing` or Perfetto).
+        """
+        pid = os.getpid()
+        trace_events = [
+            {
+                "name": event.name
+                if event.variable is None
+                else f"{event.name} {event.variable.name}",
+                "cat": "decide",
+                "ph": "X",
+                # In microseconds
+                "ts": event.start * 1e6,
+                "dur": event.duration * 1e6,
+                "pid": pid,
+                "tid": 0,
+                "args": event.to_dict(),
+            }
+            for event in self.events
+        ]
+        with open(path, "w") as file:
+            json.dump({"traceEvents": trace_events}, file)
+
+
+@contextmanager
+def _timed_stage(
+    stats: "DecideStats", name: str, stage: AbstractContextManager[StageResult]
+) -> Iterator[StageResult]:
+    start = time.perf_counter()
+    with stage as result:
+        yield result
+    stats.add_stage(name, time.perf_counter() - start, result.formula)
+
+
+def traced_stage(
+    trace: Trace | None,
+    name: str,
+    formula: LogicFormula,
+    variable: Variable | None = None,
+    stats: "DecideStats | None" = None,
+) -> AbstractContextManager[StageResult]:
+    """
+    Same as `trace.stage(name, formula, variable)`, that also adds the stage to `stats`.
+
+    Does nothing if neither `trace` nor `stats` are given.
+    """
+    stage: AbstractContextManager[StageResult] = (
+        nullcontext(StageResult(formula))
+        if trace is None
+        else trace.stage(name, formula, variable)
+    )
+    if stats is None:
+        return stage
+    return _timed_stage(stats, name, stage)
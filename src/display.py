@@ -1,5 +1,6 @@
 # Colors for colorful printing of formulas (from user's terminal)
-from enum import Enum
+from enum import Enum, IntEnum
+from typing import Any
 
 COLORS = [30, 31, 32, 33, 34, 35, 36, 37, 38, 39]
 COLORS_DEPTH = [35, 36, 34, 32, 33, 31, 95, 96, 94, 92, 93, 91]
@@ -16,8 +17,19 @@ class Coloring(Enum):
     DEPTH = 2
 
 
+# Verbosity levels for the verbose output of `decide`
+class Verbosity(IntEnum):
+    # The formula to decide and the final formula
+    SUMMARY = 1
+    # Each eliminated variable
+    STEPS = 2
+    # The intermediate forms (NNF, DNF) of each elimination
+    FORMS = 3
+
+
 COLORING = Coloring.SYNTAX
 PRINTING = True
+VERBOSITY = Verbosity.FORMS
 
 
 def color(color: int, text: str):
@@ -40,6 +52,19 @@ def color_by_depth(level: int, text: str):
     return f"\x1b[{COLORS_DEPTH[level % len(COLORS_DEPTH)]}m{text}{COLOR_RESET}"
 
 
-def show(string: str):
-    if PRINTING:
-        print(string)
+def is_shown(level: Verbosity) -> bool:
+    """
+    Returns `True` if messages of this level are printed.
+    """
+    return PRINTING and level <= VERBOSITY
+
+
+def show(message: str, *args: Any, level: Verbosity = Verbosity.SUMMARY):
+    """
+    Prints the message if messages of this level are printed.
+
+    The `args` are formatted into `message` (with `str.format`) only when it is printed,
+    so that big formulas aren’t displayed for nothing.
+    """
+    if is_shown(level):
+        print(message.format(*args) if len(args) > 0 else message)
@@ -1,11 +1,17 @@
 from enum import StrEnum
-from itertools import chain
-from typing import Iterator, Self
+from typing import Self
 
 from display import color, color_by_depth
 
-from .types import ArithExpression, IntoArithExpression, into_arith_expr
-from .variable import IntoVariable, Variable, into_variable
+from .traversal import Rope
+from .types import (
+    ArithExpression,
+    HashConsed,
+    IntoArithExpression,
+    hash_cons,
+    into_arith_expr,
+)
+from .variable import IntoVariable, into_variable
 
 
 class ArithOpType(StrEnum):
@@ -18,77 +24,79 @@ class ArithOpType(StrEnum):
         return self
 
 
-class ArithOp(ArithExpression):
+class ArithOp(HashConsed, ArithExpression):
     """
     Arithmetic operations (addition, substraction and product).
     """
 
     col = 4
+    _fields = __slots__ = ("expr1", "arithop", "expr2")
+    expr1: ArithExpression
+    arithop: ArithOpType
+    expr2: ArithExpression
 
-    def __init__(
-        self,
+    def __new__(
+        cls,
         expr1: IntoArithExpression,
         arithop: ArithOpType,
         expr2: IntoArithExpression,
-    ):
-        self.expr1 = into_arith_expr(expr1)
-        self.arithop = arithop
-        self.expr2 = into_arith_expr(expr2)
-
-    def is_syntaxically_eq(self, rhs: Self) -> bool:
-        return (
-            self.expr1.is_syntaxically_eq(rhs.expr1)
-            and self.arithop == rhs.arithop
-            and self.expr2.is_syntaxically_eq(rhs.expr2)
-        )
-
-    def __repr_syntax__(self) -> str:
-        expr1 = repr(self.expr1)
-        expr2 = repr(self.expr2)
+    ) -> "ArithOp":
+        return hash_cons(cls, into_arith_expr(expr1), arithop, into_arith_expr(expr2))
+
+    def children(self) -> tuple[ArithExpression, ...]:
+        return (self.expr1, self.expr2)
+
+    def __repr_syntax_node__(self, children: list[Rope]) -> Rope:
+        expr1, expr2 = children
         if isinstance(self.expr1, ArithOp) and self.expr1.arithop in [
             ArithOpType.SUM,
             ArithOpType.SUB,
         ]:
-            expr1 = f"{color(self.col, '(')}{expr1}{color(self.col, ')')}"
+            expr1 = (color(self.col, "("), expr1, color(self.col, ")"))
         if isinstance(self.expr2, ArithOp) and self.expr2.arithop in [
             ArithOpType.SUM,
             ArithOpType.SUB,
         ]:
-            expr2 = f"{color(self.col, '(')}{expr2}{color(self.col, ')')}"
+            expr2 = (color(self.col, "("), expr2, color(self.col, ")"))
         if self.arithop == ArithOpType.PROD:
-            return f"{expr1}{expr2}"
+            return (expr1, expr2)
         else:
-            return f"{expr1} {color(self.col, self.arithop)} {expr2}"
+            return (expr1, f" {color(self.col, self.arithop)} ", expr2)
 
-    def __repr_depth__(self, level: int) -> str:
-        expr1 = self.expr1.__repr_depth__(level)
-        expr2 = self.expr2.__repr_depth__(level)
+    def __repr_depth_node__(self, level: int, children: list[Rope]) -> Rope:
+        expr1, expr2 = children
         if isinstance(self.expr1, ArithOp) and self.expr1.arithop in [
             ArithOpType.SUM,
             ArithOpType.SUB,
         ]:
-            expr1 = f"{color_by_depth(level, '(')}{expr1}{color_by_depth(level, ')')}"
+            expr1 = (color_by_depth(level, "("), expr1, color_by_depth(level, ")"))
         if isinstance(self.expr2, ArithOp) and self.expr2.arithop in [
             ArithOpType.SUM,
             ArithOpType.SUB,
         ]:
-            expr2 = f"{color_by_depth(level, '(')}{expr2}{color_by_depth(level, ')')}"
+            expr2 = (color_by_depth(level, "("), expr2, color_by_depth(level, ")"))
         if self.arithop == ArithOpType.PROD:
-            return f"{expr1}{expr2}"
+            return (expr1, expr2)
         else:
-            return f"{expr1} {color_by_depth(level, self.arithop)} {expr2}"
-
-    def __iter__(self) -> Iterator[Variable]:
-        variable_list = list(set(chain(iter(self.expr1), iter(self.expr2))))
-        variable_list.sort(key=lambda v: v.name)
-        return iter(variable_list)
-
-    def replace(self, variable: IntoVariable, expr: IntoArithExpression) -> "ArithOp":
-        return ArithOp(
-            self.expr1.replace(into_variable(variable), expr),
-            self.arithop,
-            self.expr2.replace(into_variable(variable), expr),
-        )
+            return (expr1, f" {color_by_depth(level, self.arithop)} ", expr2)
+
+    def replace(
+        self, variable: IntoVariable, expr: IntoArithExpression
+    ) -> ArithExpression:
+        from .traversal import fold
+
+        variable = into_variable(variable)
+
+        def replace_inner(
+            node: ArithExpression, children: list[ArithExpression]
+        ) -> ArithExpression:
+            if isinstance(node, ArithOp):
+                if children[0] is node.expr1 and children[1] is node.expr2:
+                    return node
+                return ArithOp(children[0], node.arithop, children[1])
+            return node.replace(variable, expr)
+
+        return fold(self, replace_inner)
 
 
 class ArithOpBuilder:
@@ -0,0 +1,73 @@
+"""
+Table of the literals met during a normal form conversion, so that sets of literals are integer bitsets.
+"""
+
+from typing import Iterator
+
+from .comp import Comp, CompType
+from .notb import Not
+from .types import LogicFormula
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """
+    Iterates over the bits set in `bits` (as powers of two), from the lowest one.
+    """
+    while bits:
+        lowest = bits & -bits
+        yield lowest
+        bits ^= lowest
+
+
+class AtomTable:
+    """
+    Gives a bit to each literal : a set of literals is the sum of their bits.
+
+    `y = x` gets the same bit as `x = y` (the orientation met first is kept), and so do their negations.
+    """
+
+    __slots__ = ("bits", "literals", "complements")
+
+    def __init__(self) -> None:
+        self.bits: dict[LogicFormula, int] = {}
+        # The literal of each bit, by index
+        self.literals: list[LogicFormula] = []
+        # The bit of the complement of each literal (`0` if it wasn’t met yet), by index
+        self.complements: list[int] = []
+
+    def bit(self, literal: LogicFormula) -> int:
+        known = self.bits.get(literal)
+        if known is not None:
+            return known
+
+        index = len(self.literals)
+        bit = 1 << index
+        self.bits[literal] = bit
+        self.literals.append(literal)
+        atom = literal.formula if isinstance(literal, Not) else literal
+        if isinstance(atom, Comp) and atom.comp == CompType.EQUAL:
+            # Both orientations are in `bits`, so the complement is found whatever its orientation
+            flipped: LogicFormula = Comp(atom.expr2, CompType.EQUAL, atom.expr1)
+            self.bits[Not(flipped) if isinstance(literal, Not) else flipped] = bit
+        complement = self.bits.get(
+            atom if isinstance(literal, Not) else Not(literal), 0
+        )
+        self.complements.append(complement)
+        if complement:
+            self.complements[complement.bit_length() - 1] = bit
+        return bit
+
+    def complements_of(self, bits: int) -> int:
+        """
+        The set of the complements (already met) of a set of literals.
+        """
+        complements = 0
+        for bit in iter_bits(bits):
+            complements |= self.complements[bit.bit_length() - 1]
+        return complements
+
+    def literals_of(self, bits: int) -> list[LogicFormula]:
+        """
+        The literals of a set.
+        """
+        return [self.literals[bit.bit_length() - 1] for bit in iter_bits(bits)]
@@ -1,32 +1,29 @@
-from typing import Callable, Iterator, Self
+from typing import Iterator
 
 from display import color, color_by_depth
 
-from .types import LogicFormula
+from .traversal import Rope
+from .types import HashConsed, LogicFormula, hash_cons
 from .variable import Variable
 
 
-class BoolConst(LogicFormula):
+class BoolConst(HashConsed, LogicFormula):
     """
     Boolean constants (True or False).
     """
 
     col = 3
+    _fields = __slots__ = ("const",)
+    const: bool
 
-    def __init__(self, const: bool) -> None:
-        self.const = const
+    def __new__(cls, const: bool) -> "BoolConst":
+        return hash_cons(cls, const)
 
-    def is_syntaxically_eq(self, rhs: Self) -> bool:
-        return self.const == rhs.const
-
-    def __repr_syntax__(self):
+    def __repr_syntax_node__(self, children: list[Rope]):
         return color(self.col, "⊤" if self.const else "⊥")
 
-    def __repr_depth__(self, level: int):
+    def __repr_depth_node__(self, level: int, children: list[Rope]):
         return color_by_depth(level, "⊤" if self.const else "⊥")
 
     def __iter__(self) -> Iterator[Variable]:
         return iter([])
-
-    def map_formula(self, fn: Callable[[LogicFormula], LogicFormula]) -> LogicFormula:
-        return fn(self)
@@ -1,15 +1,16 @@
 from enum import StrEnum
-from itertools import chain
-from typing import Any, Callable, Iterator, Self
+from typing import Any, Self
 
 from display import color, color_by_depth
 
+from .traversal import Rope
 from .types import (
+    HashConsed,
     IntoLogicFormula,
     LogicFormula,
+    hash_cons,
     into_canonical_logic_formula,
 )
-from .variable import Variable
 
 
 class BoolOpType(StrEnum):
@@ -20,57 +21,80 @@ class BoolOpType(StrEnum):
         return self
 
 
-class BoolOp(LogicFormula):
+class BoolOp(HashConsed, LogicFormula):
     """
     Boolean operations (conjunctions and disjunctions).
     """
 
-    def __init__(
-        self, formula1: IntoLogicFormula, boolop: BoolOpType, formula2: IntoLogicFormula
-    ) -> None:
-        self.formula1 = into_canonical_logic_formula(formula1)
-        self.boolop = boolop
-        self.formula2 = into_canonical_logic_formula(formula2)
+    _fields = __slots__ = ("formula1", "boolop", "formula2")
+    formula1: LogicFormula
+    boolop: BoolOpType
+    formula2: LogicFormula
+
+    def __new__(
+        cls, formula1: IntoLogicFormula, boolop: BoolOpType, formula2: IntoLogicFormula
+    ) -> "BoolOp":
+        return hash_cons(
+            cls,
+            into_canonical_logic_formula(formula1),
+            boolop,
+            into_canonical_logic_formula(formula2),
+        )
 
+    @property
+    def col(self) -> int:
         match self.boolop:
             case BoolOpType.DISJ:
-                self.col = 2
+                return 2
             case BoolOpType.CONJ:
-                self.col = 1
+                return 1
 
-    def is_syntaxically_eq(self, rhs: Self) -> bool:
-        return (
-            self.formula1.is_syntaxically_eq(rhs.formula1)
-            and self.boolop == rhs.boolop
-            and self.formula2.is_syntaxically_eq(rhs.formula2)
-        )
+    def sub_formulas(self) -> tuple[LogicFormula, ...]:
+        return (self.formula1, self.formula2)
+
+    def with_sub_formulas(self, formulas: list[LogicFormula]) -> LogicFormula:
+        if formulas[0] is self.formula1 and formulas[1] is self.formula2:
+            return self
+        return BoolOp(formulas[0], self.boolop, formulas[1])
 
-    def __repr_syntax__(self) -> str:
+    def depth_children(self, level: int) -> tuple[tuple[LogicFormula, int], ...]:
+        return ((self.formula1, level + 1), (self.formula2, level + 1))
+
+    def __repr_syntax_node__(self, children: list[Rope]) -> Rope:
         from .quantifier import Quantifier
 
-        formula1 = repr(self.formula1)
-        formula2 = repr(self.formula2)
+        formula1, formula2 = children
         if isinstance(self.formula1, BoolOp) or isinstance(self.formula1, Quantifier):
-            formula1 = f"{color(self.formula1.col, '(')}{formula1}{color(self.formula1.col, ')')}"
+            formula1 = (
+                color(self.formula1.col, "("),
+                formula1,
+                color(self.formula1.col, ")"),
+            )
         if isinstance(self.formula2, BoolOp) or isinstance(self.formula2, Quantifier):
-            formula2 = f"{color(self.formula2.col, '(')}{formula2}{color(self.formula2.col, ')')}"
-        return f"{formula1} {color(self.col, self.boolop)} {formula2}"
+            formula2 = (
+                color(self.formula2.col, "("),
+                formula2,
+                color(self.formula2.col, ")"),
+            )
+        return (formula1, f" {color(self.col, self.boolop)} ", formula2)
 
-    def __repr_depth__(self, level: int) -> str:
+    def __repr_depth_node__(self, level: int, children: list[Rope]) -> Rope:
         from .quantifier import Quantifier
 
-        formula1 = self.formula1.__repr_depth__(level + 1)
-        formula2 = self.formula2.__repr_depth__(level + 1)
+        formula1, formula2 = children
         if isinstance(self.formula1, BoolOp) or isinstance(self.formula1, Quantifier):
-            formula1 = f"{color_by_depth(level + 1, '(')}{formula1}{color_by_depth(level + 1, ')')}"
+            formula1 = (
+                color_by_depth(level + 1, "("),
+                formula1,
+                color_by_depth(level + 1, ")"),
+            )
         if isinstance(self.formula2, BoolOp) or isinstance(self.formula2, Quantifier):
-            formula2 = f"{color_by_depth(level + 1, '(')}{formula2}{color_by_depth(level + 1, ')')}"
-        return f"{formula1} {color_by_depth(level, self.boolop)} {formula2}"
-
-    def __iter__(self) -> Iterator[Variable]:
-        variable_list = list(set(chain(iter(self.formula1), iter(self.formula2))))
-        variable_list.sort(key=lambda v: v.name)
-        return iter(variable_list)
+            formula2 = (
+                color_by_depth(level + 1, "("),
+                formula2,
+                color_by_depth(level + 1, ")"),
+            )
+        return (formula1, f" {color_by_depth(level, self.boolop)} ", formula2)
 
     def __lt__(self, rhs: Any):
         raise SyntaxError("Cannot compare booleans")
@@ -78,15 +102,6 @@ class BoolOp(LogicFormula):
     def __gt__(self, rhs: Any):
         raise SyntaxError("Cannot compare booleans")
 
-    def map_formula(self, fn: Callable[[LogicFormula], LogicFormula]) -> LogicFormula:
-        return fn(
-            BoolOp(
-                self.formula1.map_formula(fn),
-                self.boolop,
-                self.formula2.map_formula(fn),
-            )
-        )
-
 
 class BoolOpBuilder:
     def __init__(self, op: BoolOpType) -> None:
@@ -1,11 +1,18 @@
 from enum import StrEnum
-from itertools import chain
-from typing import Callable, Iterator, Self
+from typing import Self
 
 from display import color, color_by_depth
 
-from .types import IntoArithExpression, LogicFormula, into_arith_expr
-from .variable import Variable
+from .traversal import Rope
+from .types import (
+    ArithExpression,
+    HashConsed,
+    IntoArithExpression,
+    LogicFormula,
+    hash_cons,
+    into_arith_expr,
+)
+from .variable import IntoVariable
 
 
 class CompType(StrEnum):
@@ -19,37 +26,40 @@ class CompType(StrEnum):
         return self
 
 
-class Comp(LogicFormula):
+class Comp(HashConsed, LogicFormula):
     """
     Comparison (equality and lower-than).
     """
 
     col = 3
+    _fields = __slots__ = ("expr1", "comp", "expr2")
+    expr1: ArithExpression
+    comp: CompType
+    expr2: ArithExpression
 
-    def __init__(
-        self, expr1: IntoArithExpression, comp: CompType, expr2: IntoArithExpression
-    ) -> None:
-        self.expr1 = into_arith_expr(expr1)
-        self.comp = comp
-        self.expr2 = into_arith_expr(expr2)
+    def __new__(
+        cls, expr1: IntoArithExpression, comp: CompType, expr2: IntoArithExpression
+    ) -> "Comp":
+        return hash_cons(cls, into_arith_expr(expr1), comp, into_arith_expr(expr2))
 
-    def is_syntaxically_eq(self, rhs: Self) -> bool:
-        return (
-            self.expr1.is_syntaxically_eq(rhs.expr1)
-            and self.comp == rhs.comp
-            and self.expr2.is_syntaxically_eq(rhs.expr2)
-        )
+    def children(self) -> tuple[ArithExpression, ...]:
+        return (self.expr1, self.expr2)
 
-    def __repr_syntax__(self) -> str:
-        return f"{self.expr1} {color(self.col, self.comp)} {self.expr2}"
+    def __repr_syntax_node__(self, children: list[Rope]) -> Rope:
+        return (children[0], f" {color(self.col, self.comp)} ", children[1])
 
-    def __repr_depth__(self, level: int) -> str:
-        return f"{self.expr1.__repr_depth__(level)} {color_by_depth(level, self.comp)} {self.expr2.__repr_depth__(level)}"
+    def __repr_depth_node__(self, level: int, children: list[Rope]) -> Rope:
+        return (children[0], f" {color_by_depth(level, self.comp)} ", children[1])
 
-    def __iter__(self) -> Iterator[Variable]:
-        variable_list = list(set(chain(iter(self.expr1), iter(self.expr2))))
-        variable_list.sort(key=lambda v: v.name)
-        return iter(variable_list)
+    def replace(self, variable: IntoVariable, expr: IntoArithExpression) -> "Comp":
+        """
+        Replaces a variable by an expression on both sides of the comparison.
+        """
+        expr1 = self.expr1.replace(variable, expr)
+        expr2 = self.expr2.replace(variable, expr)
+        if expr1 is self.expr1 and expr2 is self.expr2:
+            return self
+        return Comp(expr1, self.comp, expr2)
 
     def __bool__(self):
         """
@@ -57,9 +67,6 @@ class Comp(LogicFormula):
         """
         return self.expr1.is_syntaxically_eq(self.expr2)
 
-    def map_formula(self, fn: Callable[[LogicFormula], LogicFormula]) -> LogicFormula:
-        return fn(self)
-
     # TODO Maybe implement a < b < c, for example as (a < b) and (b < c)
 
 
@@ -1,27 +1,185 @@
-from typing import Iterator
-
 from display import color, color_by_depth
 
+from .atom_table import AtomTable, iter_bits
 from .boolconst import BoolConst
 from .boolop import BoolOp, BoolOpType
 from .comp import Comp, CompType
-from .formula_set import FormulaSet, flatten_conj, flatten_disj
+from .formula_set import FormulaSet, iter_operands
 from .notb import Not
-from .quantifier import Quantifier
+from .quantifier import Quantifier, QuantifierType
+from .traversal import Rope, fold, iter_nodes, sub_formulas_of, variable_sets
 from .types import IntoLogicFormula, LogicFormula, into_canonical_logic_formula
 from .variable import Variable
 
 
 class Form[T: LogicFormula | FormulaSet](LogicFormula):
+    __slots__ = ("formula", "_canonical")
+
     formula: T
 
     col = 9
 
-    def __repr_syntax__(self) -> str:
-        return f"{color(self.formula.col, f'{self.__class__.__name__}(')}{self.formula}{color(self.formula.col, ')')}"
+    def canonical(self) -> LogicFormula:
+        """
+        The formula as a tree of nodes.
+
+        For a `DNF` or a `CNF`, the tree is built from the sets of literals the first time
+        (in time linear in their size), then kept, so the next conversions are free.
+        """
+        if not isinstance(self.formula, FormulaSet):
+            return self.formula
+        try:
+            return self._canonical
+        except AttributeError:
+            self._canonical = into_canonical_logic_formula(self.formula)
+            return self._canonical
+
+    def children(self) -> tuple[T]:
+        return (self.formula,)
+
+    def depth_children(self, level: int) -> tuple[tuple[T, int]]:
+        return ((self.formula, level + 1),)
+
+    def __repr_syntax_node__(self, children: list[Rope]) -> Rope:
+        return (
+            color(self.formula.col, f"{self.__class__.__name__}("),
+            children[0],
+            color(self.formula.col, ")"),
+        )
+
+    def __repr_depth_node__(self, level: int, children: list[Rope]) -> Rope:
+        return (
+            color_by_depth(level, f"{self.__class__.__name__}("),
+            children[0],
+            color_by_depth(level, ")"),
+        )
+
+
+# A quantifier (with its type once the negations above it are taken into account)
+# along with the quantifiers nested in its formula
+type QuantifierTree = tuple[QuantifierType, Variable, list[QuantifierTree]]
+
+
+def _rename_bound_apart(formula: LogicFormula) -> LogicFormula:
+    """
+    Renames the quantified variables that are quantified several times or also used freely,
+    so that each quantifier has its own variable.
+    """
+    quantified: dict[Variable, int] = {}
+    names = {variable.name for variable in formula}
+    for node in iter_nodes(formula, sub_formulas_of):
+        if isinstance(node, Quantifier):
+            quantified[node.variable] = quantified.get(node.variable, 0) + 1
+            names.add(node.variable.name)
+    free = variable_sets(formula)[1]
+
+    def fresh(variable: Variable) -> Variable:
+        i = 1
+        while f"{variable.name}{i}" in names:
+            i += 1
+        names.add(f"{variable.name}{i}")
+        return Variable(f"{variable.name}{i}")
+
+    def rename(node: LogicFormula, formulas: list[LogicFormula]) -> LogicFormula:
+        node = node.with_sub_formulas(formulas)
+        if isinstance(node, Quantifier) and (
+            quantified[node.variable] > 1 or node.variable in free
+        ):
+            # Inner quantifiers are already renamed, the remaining uses are bound by this one
+            variable = fresh(node.variable)
+            return Quantifier(
+                node.quantifier, variable, node.formula[node.variable:variable]
+            )
+        return node
+
+    # Without memo : a shared quantified sub-formula gets new variables for each of its occurrences
+    return fold(formula, rename, sub_formulas_of)
+
+
+def _extract_quantifiers(
+    formula: LogicFormula,
+) -> tuple[LogicFormula, list[QuantifierTree]]:
+    """
+    Removes the quantifiers of a formula whose quantified variables are all distinct (and not free).
+
+    Returns the formula without quantifiers and the trees of the removed quantifiers.
+    """
+    type Position = tuple[LogicFormula, bool]
+    type Extracted = tuple[LogicFormula, list[QuantifierTree]]
+
+    def extract_children(position: Position) -> tuple[Position, ...]:
+        node, positive = position
+        if isinstance(node, Not):
+            return ((node.formula, not positive),)
+        return tuple((formula, positive) for formula in node.sub_formulas())
+
+    def extract(position: Position, extracted: list[Extracted]) -> Extracted:
+        node, positive = position
+        trees = [tree for _, sub_trees in extracted for tree in sub_trees]
+        if isinstance(node, Quantifier):
+            quantifier = node.quantifier
+            if not positive:
+                # ~∃x.a = ∀x.~a and ~∀x.a = ∃x.~a
+                quantifier = (
+                    QuantifierType.FORALL
+                    if quantifier == QuantifierType.EXISTS
+                    else QuantifierType.EXISTS
+                )
+            return (extracted[0][0], [(quantifier, node.variable, trees)])
+        return (node.with_sub_formulas([formula for formula, _ in extracted]), trees)
+
+    return fold((formula, True), extract, extract_children)
+
+
+def _quantifier_prefix(
+    trees: list[QuantifierTree],
+) -> list[tuple[QuantifierType, Variable]]:
+    """
+    Orders the quantifiers so that each one stays outside of the ones that were nested in it,
+    with as few alternations between `∃` and `∀` as possible.
+
+    Greedily takes every quantifier of the same type that is available, then switches type,
+    starting with the type that gives the fewest alternations.
+    """
+
+    def prefix(first: QuantifierType) -> list[tuple[QuantifierType, Variable]]:
+        waiting: dict[QuantifierType, list[QuantifierTree]] = {
+            QuantifierType.EXISTS: [],
+            QuantifierType.FORALL: [],
+        }
+        for tree in trees:
+            waiting[tree[0]].append(tree)
+        ordered: list[tuple[QuantifierType, Variable]] = []
+        current = first
+        while any(len(same_type) > 0 for same_type in waiting.values()):
+            block = list(reversed(waiting[current]))
+            waiting[current] = []
+            while block:
+                quantifier, variable, nested = block.pop()
+                ordered.append((quantifier, variable))
+                for tree in nested:
+                    if tree[0] == current:
+                        block.append(tree)
+                    else:
+                        waiting[tree[0]].append(tree)
+            current = (
+                QuantifierType.FORALL
+                if current == QuantifierType.EXISTS
+                else QuantifierType.EXISTS
+            )
+        return ordered
+
+    def alternations(ordered: list[tuple[QuantifierType, Variable]]) -> int:
+        return sum(1 for (q1, _), (q2, _) in zip(ordered, ordered[1:]) if q1 != q2)
 
-    def __repr_depth__(self, level: int) -> str:
-        return f"{color_by_depth(level, f'{self.__class__.__name__}(')}{self.formula.__repr_depth__(level + 1)}{color_by_depth(level, ')')}"
+    if len(trees) == 0:
+        return []
+    # On a tie, the type of the first quantifier is kept first
+    first = trees[0][0]
+    other = (
+        QuantifierType.FORALL if first == QuantifierType.EXISTS else QuantifierType.EXISTS
+    )
+    return min(prefix(first), prefix(other), key=alternations)
 
 
 class PNF(Form[LogicFormula]):
@@ -31,23 +189,30 @@ class PNF(Form[LogicFormula]):
     # Invariant
 
     This class must always contain a formula in it’s Prenex Normal Form.
-    This invariant is ensured by the constructor.
+    This invariant is ensured by the constructor, that moves the quantifiers of non-prenex formulas
+    to the front (see `_quantifier_prefix`).
     """
 
+    __slots__ = ()
+
     def __init__(self, formula: LogicFormula) -> None:
+        if isinstance(formula, Form):
+            # All the normal forms are prenex (see `Form.canonical` for the cost)
+            self.formula = formula.canonical()
+            return
         formula = into_canonical_logic_formula(formula)
         after_quantif = formula
         while isinstance(after_quantif, Quantifier):
             after_quantif = after_quantif.formula
 
-        # TODO Convert the formula into it’s prenex normal form instead of raising an AssertionError
-        def pnf_inner(node: LogicFormula):
-            assert not isinstance(node, Quantifier), (
-                "Cannot create a prenex formula from a non-prenex formula"
-            )
-            return node
-
-        after_quantif.map_formula(pnf_inner)
+        if any(
+            isinstance(node, Quantifier)
+            for node in iter_nodes(after_quantif, sub_formulas_of)
+        ):
+            matrix, trees = _extract_quantifiers(_rename_bound_apart(formula))
+            for quantifier, variable in reversed(_quantifier_prefix(trees)):
+                matrix = Quantifier(quantifier, variable, matrix)
+            formula = matrix
         self.formula = formula
 
 
@@ -61,47 +226,233 @@ class NNF(Form[LogicFormula]):
     This invariant is ensured by the constructor.
     """
 
+    __slots__ = ()
+
     def __init__(self, formula: PNF) -> None:
         from functions import join_quantifiers, separate_quantifiers
 
+        if (
+            isinstance(formula, NNF)
+            or isinstance(formula, DNF)
+            or isinstance(formula, CNF)
+        ):
+            # Already in negation normal form (see `Form.canonical` for the cost)
+            self.formula = formula.canonical()
+            return
+
         quantifiers, f = separate_quantifiers(formula)
 
-        def nnf_inner(node: LogicFormula):
+        # A position is a node along with its polarity (`False` if an odd number of `Not`s are above it)
+        type Position = tuple[LogicFormula, bool]
+
+        def nnf_children(position: Position) -> tuple[Position, ...]:
+            node, positive = position
+            if isinstance(node, Not):
+                return ((node.formula, not positive),)
+            elif isinstance(node, BoolOp):
+                return ((node.formula1, positive), (node.formula2, positive))
+            elif isinstance(node, Quantifier):
+                return ((node.formula, True),)
+            return ()
+
+        def nnf_inner(
+            position: Position, formulas: list[LogicFormula]
+        ) -> LogicFormula:
+            node, positive = position
             if isinstance(node, Not):
-                if isinstance(node.formula, Not):
-                    return node.formula.formula  # ~~a -> a
-                elif isinstance(node.formula, BoolOp):
-                    match node.formula.boolop:
-                        case BoolOpType.CONJ:
-                            return into_canonical_logic_formula(
-                                NNF(
-                                    PNF(~node.formula.formula1 | ~node.formula.formula2)
-                                )
-                            )  # ~(a & b) -> (~a | ~b)
-                        case BoolOpType.DISJ:
-                            return into_canonical_logic_formula(
-                                NNF(
-                                    PNF(~node.formula.formula1 & ~node.formula.formula2)
-                                )
-                            )  # ~(a | b) -> (~a & ~b)
-                elif isinstance(node.formula, Comp):
-                    match node.formula.comp:
-                        case CompType.LOWER_THAN:
-                            return (node.formula.expr1 == node.formula.expr2) | (
-                                node.formula.expr2 < node.formula.expr1
-                            )
-                        case CompType.EQUAL:
-                            return (node.formula.expr1 < node.formula.expr2) | (
-                                node.formula.expr2 < node.formula.expr1
-                            )
-                elif isinstance(node.formula, BoolConst):
-                    return BoolConst(not node.formula.const)
-            return node
-
-        f = f.map_formula(nnf_inner)
+                return formulas[0]  # ~~a -> a
+            elif isinstance(node, BoolOp):
+                if positive:
+                    return node.with_sub_formulas(formulas)
+                match node.boolop:
+                    case BoolOpType.CONJ:
+                        return formulas[0] | formulas[1]  # ~(a & b) -> (~a | ~b)
+                    case BoolOpType.DISJ:
+                        return formulas[0] & formulas[1]  # ~(a | b) -> (~a & ~b)
+            elif isinstance(node, Quantifier):
+                # Only in non-prenex formulas, the negation stays above the quantifier
+                node = node.with_sub_formulas(formulas)
+                return node if positive else Not(node)
+            elif positive:
+                return node
+            elif isinstance(node, Comp):
+                match node.comp:
+                    case CompType.LOWER_THAN:
+                        return (node.expr1 == node.expr2) | (node.expr2 < node.expr1)
+                    case CompType.EQUAL:
+                        return (node.expr1 < node.expr2) | (node.expr2 < node.expr1)
+            elif isinstance(node, BoolConst):
+                return BoolConst(not node.const)
+            return Not(node)
+
+        # Single top-down pass, shared sub-formulas are converted once per polarity
+        f = fold(
+            (f, True),
+            nnf_inner,
+            nnf_children,
+            memo={},
+            key=lambda position: (id(position[0]), position[1]),
+        )
         self.formula = join_quantifiers(quantifiers, f)
 
 
+# Number of conjunctions (or clauses) dropped by the DNF (or CNF) conversions,
+# because they were contradictory (or tautological) or contained a smaller one
+PRUNING_COUNTERS = {"contradictions": 0, "tautologies": 0, "subsumed": 0}
+
+# Number of conjunctions (or clauses) computed for the nodes of the formulas by the DNF (or CNF) conversions,
+# which measures their work (it is linear in the size of a chain of `∧` or of `∨`)
+CONVERSION_COUNTERS = {"literal_sets": 0}
+
+# Sets of literals (conjunctions for a DNF, clauses for a CNF), each one being a bitset of an `AtomTable`
+type LiteralSets = set[int]
+
+
+def _complement(literal: LogicFormula) -> LogicFormula:
+    return literal.formula if isinstance(literal, Not) else Not(literal)
+
+
+def _is_contradictory(literal: LogicFormula) -> bool:
+    """
+    Returns `True` for the literals that are always false : `⊥`, `x < x` and `¬(x = x)`.
+
+    (`bool` of a `Comp` tells if both sides are the same.)
+    """
+    if isinstance(literal, BoolConst):
+        return not literal.const
+    elif isinstance(literal, Comp):
+        return literal.comp == CompType.LOWER_THAN and bool(literal)
+    elif isinstance(literal, Not) and isinstance(literal.formula, Comp):
+        return literal.formula.comp == CompType.EQUAL and bool(literal.formula)
+    return False
+
+
+def _remove_subsumed(sets: LiteralSets) -> LiteralSets:
+    """
+    Removes the sets that contain a smaller one (`a ∨ (a ∧ b)` is `a`, and `a ∧ (a ∨ b)` is `a`).
+
+    The kept sets are indexed by their lowest literal, so each set is only compared with the smaller ones
+    whose lowest literal it contains.
+    """
+    if len(sets) < 2:
+        return sets
+    if 0 in sets:
+        PRUNING_COUNTERS["subsumed"] += len(sets) - 1
+        return {0}
+    kept: list[int] = []
+    index: dict[int, list[int]] = {}
+    # The keys of `index`
+    index_bits = 0
+    # Kept sets that aren’t indexed yet : distinct sets of the same size can’t contain each other
+    indexed = 0
+    for literals in sorted(sets, key=int.bit_count):
+        size = literals.bit_count()
+        while indexed < len(kept) and kept[indexed].bit_count() < size:
+            smaller = kept[indexed]
+            index.setdefault(smaller & -smaller, []).append(smaller)
+            index_bits |= smaller & -smaller
+            indexed += 1
+        if not any(
+            smaller & literals == smaller
+            for bit in iter_bits(literals & index_bits)
+            for smaller in index[bit]
+        ):
+            kept.append(literals)
+    PRUNING_COUNTERS["subsumed"] += len(sets) - len(kept)
+    return set(kept)
+
+
+def _conj_product(
+    operands: list[LiteralSets], table: AtomTable, counter: str
+) -> LiteralSets:
+    """
+    The conjunctions of the conjunction of several operands : the unions of a conjunction of each operand,
+    without those that contain a literal and its complement (counted in `PRUNING_COUNTERS[counter]`).
+
+    The complements of the conjunctions of each operand are computed once, when the operand is multiplied,
+    instead of those of the growing product. The conjunctions that contain another one are removed
+    after each operand, as multiplying them could only give more of them.
+    """
+    product: LiteralSets = {0}
+    # The smallest operands first, to drop contradictory conjunctions as early as possible
+    for operand in sorted(operands, key=len):
+        if len(product) == 0:
+            break
+        # All the literals of the product are already in the table, so these complements are complete
+        complements = [(conj, table.complements_of(conj)) for conj in operand]
+        next_product: LiteralSets = set()
+        for conj1 in product:
+            for conj2, complements2 in complements:
+                if conj1 & complements2:
+                    PRUNING_COUNTERS[counter] += 1
+                    continue
+                next_product.add(conj1 | conj2)
+        product = _remove_subsumed(next_product)
+    return product
+
+
+def _dnf_conjunctions(
+    formula: LogicFormula,
+    table: AtomTable,
+    positive: bool = True,
+    counter: str = "contradictions",
+) -> LiteralSets:
+    """
+    Computes the DNF of a formula (or of its negation if not `positive`), as a set of conjunctions of literals
+    (bitsets of `table`).
+
+    It is computed bottom-up, each conjunction being a set, so duplicates are removed,
+    contradictory conjunctions are dropped as soon as they appear instead of being built (and counted in
+    `PRUNING_COUNTERS[counter]`), and so are the conjunctions that contain another one.
+    A chain of `∧` (or of `∨`) is a single node whose operands are combined at once,
+    so long chains don’t copy the sets built so far at each operand.
+    """
+    type Position = tuple[LogicFormula, bool]
+
+    def dnf_children(position: Position) -> tuple[Position, ...]:
+        node, positive = position
+        if isinstance(node, Not):
+            return ((node.formula, not positive),)
+        elif isinstance(node, BoolOp):
+            return tuple(
+                (operand, positive) for operand in iter_operands(node, node.boolop)
+            )
+        return ()
+
+    def dnf_inner(position: Position, children: list[LiteralSets]) -> LiteralSets:
+        node, positive = position
+        if isinstance(node, Not):
+            return children[0]  # ~~a -> a
+        elif isinstance(node, BoolOp):
+            if (node.boolop == BoolOpType.CONJ) == positive:
+                # a & b or ~(a | b) -> ~a & ~b
+                return _conj_product(children, table, counter)
+            else:
+                # a | b or ~(a & b) -> ~a | ~b
+                return _remove_subsumed(set().union(*children))
+        elif isinstance(node, BoolConst):
+            # `⊤` is the empty conjunction and `⊥` the empty disjunction
+            return {0} if node.const == positive else set()
+        literal = node if positive else Not(node)
+        if _is_contradictory(literal):
+            PRUNING_COUNTERS[counter] += 1
+            return set()
+        return {table.bit(literal)}
+
+    def dnf_node(position: Position, children: list[LiteralSets]) -> LiteralSets:
+        literal_sets = dnf_inner(position, children)
+        CONVERSION_COUNTERS["literal_sets"] += len(literal_sets)
+        return literal_sets
+
+    return fold(
+        (formula, positive),
+        dnf_node,
+        dnf_children,
+        memo={},
+        key=lambda position: (id(position[0]), position[1]),
+    )
+
+
 class DNF(Form[FormulaSet]):
     """
     Disjunctive Normal Form.
@@ -112,7 +463,12 @@ class DNF(Form[FormulaSet]):
     This invariant is ensured by the constructor.
     """
 
+    __slots__ = ()
+
     def __init__(self, formula: IntoLogicFormula | FormulaSet) -> None:
+        if isinstance(formula, DNF):
+            self.formula = formula.formula
+            return
         if (
             isinstance(formula, FormulaSet)
             and formula.boolop == BoolOpType.DISJ
@@ -127,47 +483,11 @@ class DNF(Form[FormulaSet]):
         while isinstance(formula, Quantifier):
             formula = formula.formula
 
-        def dnf_inner(node: LogicFormula):
-            if isinstance(node, Not):
-                if isinstance(node.formula, Not):
-                    return node.formula.formula  # ~~a -> a
-                elif isinstance(node.formula, BoolOp):
-                    lhs = node.formula.formula1.map_formula(dnf_inner)
-                    # lhs = node.formula.formula1
-                    rhs = node.formula.formula2.map_formula(dnf_inner)
-                    # rhs = node.formula.formula2
-                    match node.formula.boolop:
-                        case BoolOpType.CONJ:
-                            return ~lhs | ~rhs
-                            # ~(a & b) -> (~a | ~b)
-                        case BoolOpType.DISJ:
-                            return ~lhs & ~rhs
-                            # ~(a | b) -> (~a & ~b)
-            elif isinstance(node, BoolOp) and node.boolop == BoolOpType.CONJ:
-                if (
-                    isinstance(node.formula1, BoolOp)
-                    and node.formula1.boolop == BoolOpType.DISJ
-                ):
-                    return (
-                        node.formula1.formula1 & node.formula2
-                        | node.formula1.formula2 & node.formula2
-                    ).map_formula(dnf_inner)  # (a | b) & c -> (a & c) | (b & c)
-                elif (
-                    isinstance(node.formula2, BoolOp)
-                    and node.formula2.boolop == BoolOpType.DISJ
-                ):
-                    return (
-                        node.formula1 & node.formula2.formula1
-                        | node.formula1 & node.formula2.formula2
-                    ).map_formula(dnf_inner)  # a & (b | c) -> (a & b) | (a & c)
-            return node
-
+        table = AtomTable()
         self.formula = FormulaSet(
             set(
-                (flatten_conj(formula))
-                for formula in flatten_disj(
-                    into_canonical_logic_formula(formula).map_formula(dnf_inner)
-                ).iter_formulas()
+                FormulaSet(set(table.literals_of(conj)), BoolOpType.CONJ)
+                for conj in _dnf_conjunctions(formula, table)
             ),
             BoolOpType.DISJ,
         )
@@ -183,7 +503,12 @@ class CNF(Form[FormulaSet]):
     This invariant is ensured by the constructor.
     """
 
+    __slots__ = ()
+
     def __init__(self, formula: IntoLogicFormula | FormulaSet) -> None:
+        if isinstance(formula, CNF):
+            self.formula = formula.formula
+            return
         if (
             isinstance(formula, FormulaSet)
             and formula.boolop == BoolOpType.CONJ
@@ -198,51 +523,15 @@ class CNF(Form[FormulaSet]):
         while isinstance(formula, Quantifier):
             formula = formula.formula
 
-        def cnf_inner(node: LogicFormula):
-            if isinstance(node, Not):
-                if isinstance(node.formula, Not):
-                    return node.formula.formula  # ~~a -> a
-                elif isinstance(node.formula, BoolOp):
-                    match node.formula.boolop:
-                        case BoolOpType.CONJ:
-                            return ~node.formula.formula1.map_formula(
-                                cnf_inner
-                            ) | ~node.formula.formula2.map_formula(cnf_inner)
-                            # ~(a & b) -> (~a | ~b)
-                        case BoolOpType.DISJ:
-                            return ~node.formula.formula1.map_formula(
-                                cnf_inner
-                            ) & ~node.formula.formula2.map_formula(cnf_inner)
-                            # ~(a | b) -> (~a & ~b)
-            elif isinstance(node, BoolOp):
-                if node.boolop == BoolOpType.DISJ:
-                    if (
-                        isinstance(node.formula1, BoolOp)
-                        and node.formula1.boolop == BoolOpType.CONJ
-                    ):
-                        return (
-                            (node.formula1.formula1 | node.formula2)
-                            & (node.formula1.formula2 | node.formula2)
-                        ).map_formula(cnf_inner)  # (a & b) | c -> (a | c) & (b | c)
-                    elif (
-                        isinstance(node.formula2, BoolOp)
-                        and node.formula2.boolop == BoolOpType.CONJ
-                    ):
-                        return (
-                            (node.formula1 | node.formula2.formula1)
-                            & (node.formula1 | node.formula2.formula2)
-                        ).map_formula(cnf_inner)  # a | (b & c) -> (a | b) & (a | c)
-            return node
-
+        # The clauses of `f` are the negations of the conjunctions of the DNF of `~f`,
+        # so tautological clauses (`a ∨ ¬a`, `x = x`, `⊤`) are dropped as contradictory conjunctions
+        table = AtomTable()
         self.formula = FormulaSet(
             set(
-                flatten_disj(formula)
-                for formula in flatten_conj(
-                    into_canonical_logic_formula(formula).map_formula(cnf_inner)
-                ).iter_formulas()
+                FormulaSet(
+                    set(map(_complement, table.literals_of(conj))), BoolOpType.DISJ
+                )
+                for conj in _dnf_conjunctions(formula, table, False, "tautologies")
             ),
             BoolOpType.CONJ,
         )
-
-    def __iter__(self) -> Iterator[Variable]:
-        return iter(into_canonical_logic_formula(self))
@@ -1,11 +1,11 @@
 from itertools import chain
-from typing import Iterator, Self
+from typing import Any, Iterator, Self
 
 from display import color, color_by_depth
 
 from .boolop import BoolOp, BoolOpType
-from .types import LogicFormula
-from .variable import Variable
+from .traversal import Rope, iter_nodes, join_ropes
+from .types import CALL_COUNTERS, LogicFormula
 
 LONG_FORMULA = 100
 
@@ -15,6 +15,8 @@ class FormulaSet(LogicFormula):
     A set of formulas.
     """
 
+    __slots__ = ("formulas", "boolop")
+
     def __init__(
         self,
         formulas: set[LogicFormula | Self],
@@ -23,25 +25,58 @@ class FormulaSet(LogicFormula):
         self.formulas = formulas
         self.boolop = boolop
 
+    @property
+    def col(self) -> int:
         match self.boolop:
             case BoolOpType.DISJ:
-                self.col = 2
+                return 2
             case BoolOpType.CONJ:
-                self.col = 1
-
-    def __repr_syntax__(self) -> str:
-        return f"{color(self.col, f'{self.boolop}{{')}{color(self.col, ',\n    ' if len(self.formulas) >= LONG_FORMULA else ', ').join([repr(formula) for formula in self.formulas])}{color(self.col, '}')}"
-
-    def __repr_depth__(self, level: int) -> str:
-        return f"{color_by_depth(level, f'{self.boolop}{{')}{color_by_depth(level, ',\n    ' if len(self.formulas) >= LONG_FORMULA else ', ').join([formula.__repr_depth__(level + 1) for formula in self.formulas])}{color_by_depth(level, '}')}"
+                return 1
+
+    def children(self) -> tuple[LogicFormula | Self, ...]:
+        return tuple(self.formulas)
+
+    def depth_children(self, level: int) -> tuple[tuple[LogicFormula | Self, int], ...]:
+        return tuple((formula, level + 1) for formula in self.formulas)
+
+    def __repr_syntax_node__(self, children: list[Rope]) -> Rope:
+        return (
+            color(self.col, f"{self.boolop}{{"),
+            join_ropes(
+                color(self.col, ",\n    " if len(self.formulas) >= LONG_FORMULA else ", "),
+                children,
+            ),
+            color(self.col, "}"),
+        )
+
+    def __repr_depth_node__(self, level: int, children: list[Rope]) -> Rope:
+        return (
+            color_by_depth(level, f"{self.boolop}{{"),
+            join_ropes(
+                color_by_depth(
+                    level, ",\n    " if len(self.formulas) >= LONG_FORMULA else ", "
+                ),
+                children,
+            ),
+            color_by_depth(level, "}"),
+        )
 
     def iter_formulas(self) -> Iterator[LogicFormula | Self]:
         return iter(self.formulas)
 
-    def __iter__(self) -> Iterator[Variable]:
-        variable_list = list(set(chain.from_iterable(self.formulas)))
-        variable_list.sort(key=lambda v: v.name)
-        return iter(variable_list)
+    def is_syntaxically_eq(self, rhs: Any) -> bool:
+        if CALL_COUNTERS["active"]:
+            CALL_COUNTERS["equalities"] += 1
+        return (
+            isinstance(rhs, FormulaSet)
+            and self.boolop == rhs.boolop
+            and self.formulas == rhs.formulas
+        )
+
+    def __hash__(self) -> int:
+        if CALL_COUNTERS["active"]:
+            CALL_COUNTERS["hashes"] += 1
+        return hash((self.boolop, frozenset(self.formulas)))
 
     def __add__(self, other: Self) -> "FormulaSet":
         """
@@ -53,6 +88,21 @@ class FormulaSet(LogicFormula):
         return FormulaSet(set(chain(self.formulas, other.formulas)), self.boolop)
 
 
+def iter_operands(formula: LogicFormula, boolop: BoolOpType) -> Iterator[LogicFormula]:
+    """
+    Iterates over the operands of a chain of `BoolOp`s of type `boolop`.
+    """
+
+    def operands(node: LogicFormula) -> tuple[LogicFormula, ...]:
+        if isinstance(node, BoolOp) and node.boolop == boolop:
+            return node.sub_formulas()
+        return ()
+
+    for node in iter_nodes(formula, operands):
+        if not (isinstance(node, BoolOp) and node.boolop == boolop):
+            yield node
+
+
 def flatten_disj(
     formula: LogicFormula,
 ) -> FormulaSet:
@@ -60,9 +110,7 @@ def flatten_disj(
     Flattens a disjunctive `BoolOp` into a `FormulaSet`
     """
 
-    if isinstance(formula, BoolOp) and formula.boolop == BoolOpType.DISJ:
-        return flatten_disj(formula.formula1) + flatten_disj(formula.formula2)
-    return FormulaSet(set([formula]), BoolOpType.DISJ)
+    return FormulaSet(set(iter_operands(formula, BoolOpType.DISJ)), BoolOpType.DISJ)
 
 
 def flatten_conj(
@@ -72,6 +120,4 @@ def flatten_conj(
     Flattens a conjunctive `BoolOp` into a `FormulaSet`
     """
 
-    if isinstance(formula, BoolOp) and formula.boolop == BoolOpType.CONJ:
-        return flatten_conj(formula.formula1) + flatten_conj(formula.formula2)
-    return FormulaSet(set([formula]), BoolOpType.CONJ)
+    return FormulaSet(set(iter_operands(formula, BoolOpType.CONJ)), BoolOpType.CONJ)
@@ -1,42 +1,58 @@
-from typing import Callable, Iterator
-
 from display import color, color_by_depth
 
 from .boolconst import BoolConst
+from .traversal import Rope
 from .types import (
+    HashConsed,
     IntoLogicFormula,
     LogicFormula,
+    hash_cons,
     into_canonical_logic_formula,
 )
-from .variable import Variable
 
 
-class Not(LogicFormula):
+class Not(HashConsed, LogicFormula):
     """
     Logical negation.
     """
 
     col = 9
+    _fields = __slots__ = ("formula",)
+    formula: LogicFormula
+
+    def __new__(cls, formula: IntoLogicFormula) -> "Not":
+        return hash_cons(cls, into_canonical_logic_formula(formula))
+
+    def sub_formulas(self) -> tuple[LogicFormula, ...]:
+        return (self.formula,)
 
-    def __init__(self, formula: IntoLogicFormula) -> None:
-        self.formula = into_canonical_logic_formula(formula)
+    def with_sub_formulas(self, formulas: list[LogicFormula]) -> LogicFormula:
+        if formulas[0] is self.formula:
+            return self
+        return Not(formulas[0])
 
-    def __repr_syntax__(self) -> str:
-        formula = repr(self.formula)
+    def depth_children(self, level: int) -> tuple[tuple[LogicFormula, int], ...]:
+        if isinstance(self.formula, Not) or isinstance(self.formula, BoolConst):
+            return ((self.formula, level),)
+        else:
+            return ((self.formula, level + 1),)
+
+    def __repr_syntax_node__(self, children: list[Rope]) -> Rope:
+        formula = children[0]
         if not (isinstance(self.formula, Not) or isinstance(self.formula, BoolConst)):
             formula = (
-                f"{color(self.formula.col, '(')}{formula}{color(self.formula.col, ')')}"
+                color(self.formula.col, "("),
+                formula,
+                color(self.formula.col, ")"),
             )
-        return f"¬{formula}"
+        return ("¬", formula)
 
-    def __repr_depth__(self, level: int):
+    def __repr_depth_node__(self, level: int, children: list[Rope]) -> Rope:
         if isinstance(self.formula, Not) or isinstance(self.formula, BoolConst):
-            return f"{color_by_depth(level, '¬')}{self.formula.__repr_depth__(level)}"
+            return (color_by_depth(level, "¬"), children[0])
         else:
-            return f"{color_by_depth(level + 1, '¬(')}{self.formula.__repr_depth__(level + 1)}{color(level + 1, ')')}"
-
-    def __iter__(self) -> Iterator[Variable]:
-        return iter(self.formula)
-
-    def map_formula(self, fn: Callable[[LogicFormula], LogicFormula]) -> LogicFormula:
-        return fn(Not(self.formula.map_formula(fn)))
+            return (
+                color_by_depth(level + 1, "¬("),
+                children[0],
+                color(level + 1, ")"),
+            )
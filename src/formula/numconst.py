@@ -2,27 +2,27 @@ from typing import Iterator, Self
 
 from display import color, color_by_depth
 
-from .types import ArithExpression, IntoArithExpression
+from .traversal import Rope
+from .types import ArithExpression, HashConsed, IntoArithExpression, hash_cons
 from .variable import IntoVariable, Variable
 
 
-class NumConst(ArithExpression):
+class NumConst(HashConsed, ArithExpression):
     """
     Number constant (float or int).
     """
 
     col = 6
+    _fields = __slots__ = ("const",)
+    const: int | float
 
-    def __init__(self, const: int | float) -> None:
-        self.const = const
+    def __new__(cls, const: int | float) -> "NumConst":
+        return hash_cons(cls, const)
 
-    def is_syntaxically_eq(self, rhs: Self) -> bool:
-        return self.const == rhs.const
-
-    def __repr_syntax__(self):
+    def __repr_syntax_node__(self, children: list[Rope]):
         return color(self.col, str(self.const))
 
-    def __repr_depth__(self, level: int):
+    def __repr_depth_node__(self, level: int, children: list[Rope]):
         return color_by_depth(level, str(self.const))
 
     def __iter__(self) -> Iterator[Variable]:
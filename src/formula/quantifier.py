@@ -1,11 +1,14 @@
 from enum import StrEnum
-from typing import Callable, Iterator, Self
+from typing import Self
 
 from display import color, color_by_depth
 
+from .traversal import Rope, VariableSets
 from .types import (
+    HashConsed,
     IntoLogicFormula,
     LogicFormula,
+    hash_cons,
     into_canonical_logic_formula,
 )
 from .variable import IntoVariable, Variable, into_variable
@@ -22,50 +25,76 @@ class QuantifierType(StrEnum):
         return self
 
 
-class Quantifier(LogicFormula):
+class Quantifier(HashConsed, LogicFormula):
     """
     Logical quantifier (universal and existential).
     """
 
     col = 5
+    _fields = __slots__ = ("quantifier", "variable", "formula")
+    quantifier: QuantifierType
+    variable: Variable
+    formula: LogicFormula
 
-    def __init__(
-        self,
+    def __new__(
+        cls,
         quantifier: QuantifierType,
         variable: IntoVariable,
         formula: IntoLogicFormula,
-    ) -> None:
-        self.quantifier = quantifier
-        self.variable = into_variable(variable)
-        self.formula = into_canonical_logic_formula(formula)
-
-    def __repr_syntax__(self):
-        formula = repr(self.formula)
-        if not isinstance(self.formula, Quantifier):
-            formula = (
-                f"{color(self.formula.col, '(')}{formula}{color(self.formula.col, ')')}"
-            )
-        return f"{color(self.col, self.quantifier)}{self.variable}{color(self.col, '.')}{formula}"
+    ) -> "Quantifier":
+        return hash_cons(
+            cls,
+            quantifier,
+            into_variable(variable),
+            into_canonical_logic_formula(formula),
+        )
 
-    def __repr_depth__(self, level: int):
-        formula = self.formula.__repr_depth__(
-            level + (1 if not isinstance(self.formula, Quantifier) else 0)
+    def sub_formulas(self) -> tuple[LogicFormula, ...]:
+        # The quantified variable isn’t a child : unused quantified variables are not listed by `__iter__`
+        return (self.formula,)
+
+    def with_sub_formulas(self, formulas: list[LogicFormula]) -> LogicFormula:
+        if formulas[0] is self.formula:
+            return self
+        return Quantifier(self.quantifier, self.variable, formulas[0])
+
+    def depth_children(self, level: int) -> tuple[tuple[LogicFormula, int], ...]:
+        return (
+            (
+                self.formula,
+                level + (1 if not isinstance(self.formula, Quantifier) else 0),
+            ),
         )
+
+    def __repr_syntax_node__(self, children: list[Rope]) -> Rope:
+        formula = children[0]
         if not isinstance(self.formula, Quantifier):
             formula = (
-                f"{color_by_depth(level, '(')}{formula}{color_by_depth(level, ')')}"
+                color(self.formula.col, "("),
+                formula,
+                color(self.formula.col, ")"),
             )
-        return f"{color_by_depth(level, self.quantifier)}{self.variable.__repr_depth__(level)}{color_by_depth(level, '.')}{formula}"
-
-    def __iter__(self) -> Iterator[Variable]:
-        # TODO self.variable is in the formula ???
-        return iter(self.formula)
+        return (
+            f"{color(self.col, self.quantifier)}{self.variable}{color(self.col, '.')}",
+            formula,
+        )
 
-    def map_formula(self, fn: Callable[[LogicFormula], LogicFormula]) -> LogicFormula:
-        return fn(
-            Quantifier(self.quantifier, self.variable, self.formula.map_formula(fn))
+    def __repr_depth_node__(self, level: int, children: list[Rope]) -> Rope:
+        formula = children[0]
+        if not isinstance(self.formula, Quantifier):
+            formula = (color_by_depth(level, "("), formula, color_by_depth(level, ")"))
+        return (
+            f"{color_by_depth(level, self.quantifier)}{self.variable.__repr_depth__(level)}{color_by_depth(level, '.')}",
+            formula,
         )
 
+    def __variables_node__(self, children: list[VariableSets]) -> VariableSets:
+        variables, free = children[0]
+        if self.variable in free:
+            # The quantified variable is bound in the whole inner formula
+            free = free - {self.variable}
+        return (variables, free)
+
 
 class QuantifierBuilder:
     def __init__(self, quantif: QuantifierType) -> None:
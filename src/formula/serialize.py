@@ -0,0 +1,316 @@
+"""
+Compact binary encoding of formulas, `FormulaSet`s and normal forms (`dumps` and `loads`).
+
+The encoding starts with `MAGIC` and the `VERSION` of the format, then the table of the variable names,
+then the nodes in post-order, each one being an opcode followed by its operands. A child is referenced
+by the distance back to its record (the members of a `FormulaSet` by the indices of their records,
+in an array of fixed-width integers), so a sub-formula shared several times (nodes are hash-consed) is written once.
+The last node is the root. The other integers are written as varints (7 bits per byte).
+"""
+
+import struct
+import sys
+from array import array
+from operator import itemgetter
+from typing import Any, Sequence
+
+from .arithop import ArithOp, ArithOpType
+from .boolconst import BoolConst
+from .boolop import BoolOp, BoolOpType
+from .comp import Comp, CompType
+from .forms import CNF, DNF, NNF, PNF, Form
+from .formula_set import FormulaSet
+from .notb import Not
+from .numconst import NumConst
+from .quantifier import Quantifier, QuantifierType
+from .types import ArithExpression, LogicFormula
+from .variable import Variable
+
+MAGIC = b"FML"
+VERSION = 1
+
+type Serializable = LogicFormula | FormulaSet | ArithExpression
+
+# Opcodes
+_VARIABLE = 0
+_INT = 1
+_FLOAT = 2
+_ARITHOPS = {ArithOpType.SUM: 3, ArithOpType.SUB: 4, ArithOpType.PROD: 5}
+_COMPS = {CompType.EQUAL: 6, CompType.LOWER_THAN: 7}
+_FALSE = 8
+_TRUE = 9
+_NOT = 10
+_BOOLOPS = {BoolOpType.CONJ: 11, BoolOpType.DISJ: 12}
+_QUANTIFIERS = {QuantifierType.FORALL: 13, QuantifierType.EXISTS: 14}
+_FORMULA_SETS = {BoolOpType.CONJ: 15, BoolOpType.DISJ: 16}
+_FORMS: dict[type[Form], int] = {PNF: 17, NNF: 18, DNF: 19, CNF: 20}
+
+_DOUBLE = struct.Struct("<d")
+# Types of the arrays of the members of a set (little-endian), by their code
+_ARRAY_TYPECODES = ["B", "H", "I", "Q"]
+
+
+def _write_uint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_uint(data: bytes, pos: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _serialized_children(node: Any) -> Sequence[Any]:
+    if isinstance(node, Quantifier):
+        # The quantified variable isn’t one of the children of the traversals
+        return (node.variable, node.formula)
+    return node.children()
+
+
+def _indices_array(indices: list[int]) -> tuple[int, array[int]]:
+    # The members of a set are written as an array of record indices of the smallest width
+    largest = max(indices, default=0)
+    for code, typecode in enumerate(_ARRAY_TYPECODES):
+        if largest < 1 << (8 * array(typecode).itemsize):
+            return code, array(typecode, indices)
+    raise ValueError("Formula too big to be serialized")
+
+
+def dumps(obj: Serializable) -> bytes:
+    """
+    Encodes a formula, a `FormulaSet`, a normal form or an arithmetic expression.
+    """
+    strings: dict[str, int] = {}
+    nodes = bytearray()
+    # The index of the record of each node already written, by `id` (`obj` keeps the nodes alive)
+    indices: dict[int, int] = {}
+    stack = [obj]
+    while stack:
+        node = stack[-1]
+        if id(node) in indices:
+            stack.pop()
+            continue
+        children = _serialized_children(node)
+        child_indices = list(map(indices.get, map(id, children)))
+        if None in child_indices:
+            # Come back to this node once all its children are written
+            stack.extend(
+                child
+                for child, index in zip(reversed(children), reversed(child_indices))
+                if index is None
+            )
+            continue
+        stack.pop()
+
+        count = len(indices)
+        node_type = type(node)
+        if node_type is FormulaSet:
+            nodes.append(_FORMULA_SETS[node.boolop])
+            _write_uint(nodes, len(children))
+            code, members = _indices_array(child_indices)  # type: ignore
+            nodes.append(code)
+            if sys.byteorder != "little":
+                members.byteswap()
+            nodes.extend(members.tobytes())
+        else:
+            if node_type is Comp:
+                nodes.append(_COMPS[node.comp])
+            elif node_type is Variable:
+                nodes.append(_VARIABLE)
+                _write_uint(nodes, strings.setdefault(node.name, len(strings)))
+            elif node_type is BoolOp:
+                nodes.append(_BOOLOPS[node.boolop])
+            elif node_type is Not:
+                nodes.append(_NOT)
+            elif node_type is Quantifier:
+                nodes.append(_QUANTIFIERS[node.quantifier])
+            elif node_type is BoolConst:
+                nodes.append(_TRUE if node.const else _FALSE)
+            elif node_type is ArithOp:
+                nodes.append(_ARITHOPS[node.arithop])
+            elif node_type is NumConst and type(node.const) is int:
+                nodes.append(_INT)
+                # Zigzag, so that small negative numbers are short too
+                _write_uint(
+                    nodes, node.const * 2 if node.const >= 0 else -node.const * 2 - 1
+                )
+            elif node_type is NumConst and type(node.const) is float:
+                nodes.append(_FLOAT)
+                nodes.extend(_DOUBLE.pack(node.const))
+            elif node_type in _FORMS:
+                nodes.append(_FORMS[node_type])
+            else:
+                raise TypeError(f"Cannot serialize {node!r}")
+            for index in child_indices:
+                _write_uint(nodes, count - index)  # type: ignore
+        indices[id(node)] = count
+
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    _write_uint(out, len(strings))
+    for name in strings:
+        encoded = name.encode()
+        _write_uint(out, len(encoded))
+        out += encoded
+    _write_uint(out, len(indices))
+    out += nodes
+    return bytes(out)
+
+
+_ARITHOP_TYPES = {code: arithop for arithop, code in _ARITHOPS.items()}
+_COMP_TYPES = {code: comp for comp, code in _COMPS.items()}
+_BOOLOP_TYPES = {code: boolop for boolop, code in _BOOLOPS.items()}
+_QUANTIFIER_TYPES = {code: quantifier for quantifier, code in _QUANTIFIERS.items()}
+_FORMULA_SET_TYPES = {code: boolop for boolop, code in _FORMULA_SETS.items()}
+_FORM_TYPES = {code: form for form, code in _FORMS.items()}
+
+
+def loads(data: bytes) -> Serializable:
+    """
+    Decodes what `dumps` encoded.
+
+    Raises `ValueError` if `data` isn’t a valid encoding of this version of the format.
+    """
+    if data[: len(MAGIC)] != MAGIC:
+        raise ValueError("Not a serialized formula")
+    if len(data) <= len(MAGIC) or data[len(MAGIC)] != VERSION:
+        raise ValueError(
+            f"Unsupported version of serialized formula (expected {VERSION})"
+        )
+    try:
+        return _loads(data, len(MAGIC) + 1)
+    except IndexError:
+        raise ValueError("Truncated serialized formula") from None
+    except TypeError as error:
+        # Some operand that the checks of `_loads` let through
+        raise ValueError(f"Invalid serialized formula ({error})") from None
+
+
+def _is_form_of(form: type[Form], formula: Any) -> bool:
+    """
+    Tells if `formula` has the shape of the formulas of `form`, so a decoded form keeps its invariant.
+    """
+    if form is DNF or form is CNF:
+        outer, inner = (
+            (BoolOpType.DISJ, BoolOpType.CONJ)
+            if form is DNF
+            else (BoolOpType.CONJ, BoolOpType.DISJ)
+        )
+        return (
+            type(formula) is FormulaSet
+            and formula.boolop == outer
+            and all(
+                type(member) is FormulaSet and member.boolop == inner
+                for member in formula.formulas
+            )
+        )
+    return isinstance(formula, LogicFormula) and not isinstance(
+        formula, (FormulaSet, Form)
+    )
+
+
+def _loads(data: bytes, pos: int) -> Serializable:
+    string_count, pos = _read_uint(data, pos)
+    strings: list[str] = []
+    for _ in range(string_count):
+        length, pos = _read_uint(data, pos)
+        if pos + length > len(data):
+            raise IndexError()
+        strings.append(data[pos : pos + length].decode())
+        pos += length
+
+    node_count, pos = _read_uint(data, pos)
+    nodes: list[Any] = []
+
+    def child(expected: type) -> Any:
+        nonlocal pos
+        distance, pos = _read_uint(data, pos)
+        if not 0 < distance <= len(nodes):
+            raise ValueError("Invalid reference in serialized formula")
+        node = nodes[len(nodes) - distance]
+        if not isinstance(node, expected):
+            raise ValueError(
+                f"Invalid operand {type(node).__name__} for opcode {opcode} "
+                "in serialized formula"
+            )
+        return node
+
+    for _ in range(node_count):
+        opcode = data[pos]
+        pos += 1
+        node: Any
+        if opcode in _COMP_TYPES:
+            expr1, expr2 = child(ArithExpression), child(ArithExpression)
+            node = Comp(expr1, _COMP_TYPES[opcode], expr2)
+        elif opcode == _VARIABLE:
+            index, pos = _read_uint(data, pos)
+            node = Variable(strings[index])
+        elif opcode == _INT:
+            zigzag, pos = _read_uint(data, pos)
+            node = NumConst(zigzag // 2 if zigzag % 2 == 0 else -(zigzag + 1) // 2)
+        elif opcode == _FLOAT:
+            if pos + _DOUBLE.size > len(data):
+                raise IndexError()
+            node = NumConst(_DOUBLE.unpack_from(data, pos)[0])
+            pos += _DOUBLE.size
+        elif opcode == _FALSE or opcode == _TRUE:
+            node = BoolConst(opcode == _TRUE)
+        elif opcode in _ARITHOP_TYPES:
+            expr1, expr2 = child(ArithExpression), child(ArithExpression)
+            node = ArithOp(expr1, _ARITHOP_TYPES[opcode], expr2)
+        elif opcode == _NOT:
+            node = Not(child(LogicFormula))
+        elif opcode in _BOOLOP_TYPES:
+            formula1, formula2 = child(LogicFormula), child(LogicFormula)
+            node = BoolOp(formula1, _BOOLOP_TYPES[opcode], formula2)
+        elif opcode in _QUANTIFIER_TYPES:
+            variable, formula = child(Variable), child(LogicFormula)
+            node = Quantifier(_QUANTIFIER_TYPES[opcode], variable, formula)
+        elif opcode in _FORMULA_SET_TYPES:
+            size, pos = _read_uint(data, pos)
+            if data[pos] >= len(_ARRAY_TYPECODES):
+                raise ValueError("Invalid set in serialized formula")
+            members = array(_ARRAY_TYPECODES[data[pos]])
+            pos += 1
+            end = pos + size * members.itemsize
+            if end > len(data):
+                raise IndexError()
+            members.frombytes(data[pos:end])
+            pos = end
+            if sys.byteorder != "little":
+                members.byteswap()
+            if size == 0:
+                formulas = set()
+            elif max(members) >= len(nodes):
+                raise ValueError("Invalid reference in serialized formula")
+            elif size == 1:
+                formulas = {nodes[members[0]]}
+            else:
+                formulas = set(itemgetter(*members)(nodes))
+            if not all(isinstance(member, LogicFormula) for member in formulas):
+                raise ValueError("Invalid member of a set in serialized formula")
+            node = FormulaSet(formulas, _FORMULA_SET_TYPES[opcode])
+        elif opcode in _FORM_TYPES:
+            # The formula was already in this normal form, so it isn’t normalized again
+            formula = child(LogicFormula)
+            if not _is_form_of(_FORM_TYPES[opcode], formula):
+                raise ValueError(
+                    f"Invalid {_FORM_TYPES[opcode].__name__} in serialized formula"
+                )
+            node = object.__new__(_FORM_TYPES[opcode])
+            node.formula = formula
+        else:
+            raise ValueError(f"Unknown opcode {opcode} in serialized formula")
+        nodes.append(node)
+
+    if len(nodes) == 0 or pos != len(data):
+        raise ValueError("Invalid serialized formula")
+    return nodes[-1]
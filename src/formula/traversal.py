@@ -0,0 +1,207 @@
+"""
+Iterative traversals of formulas.
+
+Every traversal here uses an explicit stack instead of Python recursion,
+so very deep formulas (for example long chains of conjunctions) never hit the recursion limit.
+"""
+
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Sequence
+
+if TYPE_CHECKING:
+    from .variable import Variable
+
+# Text made of nested pieces, so that displaying a node doesn’t copy the text of its children
+type Rope = str | tuple[Rope, ...]
+
+# All the variables used under a node, and the ones that are free
+type VariableSets = tuple[frozenset["Variable"], frozenset["Variable"]]
+
+NO_VARIABLES: VariableSets = (frozenset(), frozenset())
+
+
+def children_of(node: Any) -> Sequence[Any]:
+    """
+    All the direct sub-nodes of a node (sub-formulas, arithmetic expressions, members of a `FormulaSet`, …).
+    """
+    return node.children()
+
+
+def sub_formulas_of(node: Any) -> Sequence[Any]:
+    """
+    The direct logical sub-formulas of a node (arithmetic expressions are not visited).
+    """
+    return node.sub_formulas()
+
+
+def iter_nodes[N](
+    root: N, children: Callable[[N], Sequence[N]] = children_of
+) -> Iterator[N]:
+    """
+    Iterates over all the nodes under `root` (included), in pre-order.
+    """
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(children(node)))
+
+
+def fold[N, R](
+    root: N,
+    fn: Callable[[N, list[R]], R],
+    children: Callable[[N], Sequence[N]] = children_of,
+    memo: dict[Any, tuple[N, R]] | None = None,
+    key: Callable[[N], Any] = id,
+) -> R:
+    """
+    Post-order traversal : computes `fn(node, results)` for each node, where `results` are the values already computed for its children (in order).
+
+    Returns the value computed for `root`.
+
+    If a `memo` is given, `fn` is computed only once per distinct node (nodes are shared thanks to hash-consing),
+    and the same `memo` can be given to several traversals that use the same `fn`.
+    It keeps a reference to each node, so that their `id`s stay valid.
+    Nodes are identified by `key(node)` in the `memo` (their `id` by default).
+    """
+    results: list[R] = []
+    stack: list[tuple[N, Sequence[N] | None]] = [(root, None)]
+    while stack:
+        node, node_children = stack.pop()
+        if node_children is None:
+            if memo is not None:
+                known = memo.get(key(node))
+                if known is not None:
+                    results.append(known[1])
+                    continue
+            node_children = children(node)
+            if len(node_children) > 0:
+                # Come back to this node once all its children are computed
+                stack.append((node, node_children))
+                stack.extend((child, None) for child in reversed(node_children))
+                continue
+        count = len(node_children)
+        if count > 0:
+            args = results[-count:]
+            del results[-count:]
+        else:
+            args = []
+        result = fn(node, args)
+        if memo is not None:
+            memo[key(node)] = (node, result)
+        results.append(result)
+    return results[0]
+
+
+def union_variables(children: list[VariableSets]) -> VariableSets:
+    """
+    Merges the `VariableSets` of several nodes, reusing the biggest sets when the others are included in them.
+    """
+    if len(children) == 0:
+        return NO_VARIABLES
+    all_variables, free = children[0]
+    for child_variables, child_free in children[1:]:
+        if not child_variables <= all_variables:
+            if all_variables <= child_variables:
+                all_variables = child_variables
+            else:
+                all_variables = all_variables | child_variables
+        if not child_free <= free:
+            if free <= child_free:
+                free = child_free
+            else:
+                free = free | child_free
+    return (all_variables, free)
+
+
+def _variables_children(node: Any) -> Sequence[Any]:
+    # Nodes whose sets are already known don’t need their children
+    if getattr(node, "_variables", None) is not None:
+        return ()
+    return node.children()
+
+
+def _variables_node(node: Any, children: list[VariableSets]) -> VariableSets:
+    known = getattr(node, "_variables", None)
+    if known is not None:
+        return known
+    sets = node.__variables_node__(children)
+    if hasattr(node, "_hash"):
+        # Hash-consed nodes are immutable, so their sets are computed only once
+        node._variables = sets
+    return sets
+
+
+def variable_sets(root: Any) -> VariableSets:
+    """
+    The variables used under `root`, and the free ones.
+
+    They are cached on each hash-consed node, so they are computed once per node, bottom-up.
+    """
+    return fold(root, _variables_node, _variables_children)
+
+
+def variables(root: Any) -> list["Variable"]:
+    """
+    Lists (in alphabetical order) the variables used under `root`.
+
+    Variables that only appear in a quantifier are not listed.
+    """
+    return sorted(variable_sets(root)[0], key=lambda v: v.name)
+
+
+def free_variables(root: Any) -> list["Variable"]:
+    """
+    Lists (in alphabetical order) the free variables of `root`.
+    """
+    return sorted(variable_sets(root)[1], key=lambda v: v.name)
+
+
+def join_ropes(separator: str, ropes: list[Rope]) -> Rope:
+    """
+    Same as `separator.join(ropes)`, without building the string.
+    """
+    joined: list[Rope] = []
+    for i, rope in enumerate(ropes):
+        if i > 0:
+            joined.append(separator)
+        joined.append(rope)
+    return tuple(joined)
+
+
+def rope_to_str(rope: Rope) -> str:
+    """
+    Builds the string of a `Rope`.
+    """
+    pieces: list[str] = []
+    stack = [rope]
+    while stack:
+        piece = stack.pop()
+        if isinstance(piece, str):
+            pieces.append(piece)
+        else:
+            stack.extend(reversed(piece))
+    return "".join(pieces)
+
+
+def repr_syntax(root: Any) -> str:
+    """
+    Displays `root` with `Coloring.SYNTAX` (or `Coloring.NOT_COLORED`).
+    """
+    return rope_to_str(
+        fold(root, lambda node, children: node.__repr_syntax_node__(children), memo={})
+    )
+
+
+def repr_depth(root: Any, level: int) -> str:
+    """
+    Displays `root` with `Coloring.DEPTH`, starting at depth `level`.
+    """
+    return rope_to_str(
+        fold(
+            (root, level),
+            lambda position, children: position[0].__repr_depth_node__(
+                position[1], children
+            ),
+            lambda position: position[0].depth_children(position[1]),
+        )
+    )
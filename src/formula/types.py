@@ -1,8 +1,10 @@
 # Compatibility with Python 3.12 and 3.13
 from __future__ import annotations
 
+from contextlib import contextmanager
 from functools import reduce
 from typing import TYPE_CHECKING, Any, Callable, Iterator, Self, overload
+from weakref import KeyedRef
 
 import display
 
@@ -13,16 +15,119 @@ type IntoArithExpression = ArithExpression | int | float | str
 # Types that can be converted into a LogicFormula
 type IntoLogicFormula = LogicFormula | bool
 
+# Every hash-consed node that is still alive, keyed by its class and its fields (child nodes by identity)
+_NODES: dict[tuple[Any, ...], KeyedRef] = {}
+
+
+# Number of node constructions (calls to `hash_cons`) and of nodes actually allocated,
+# useful to check that a rewrite doesn’t rebuild untouched sub-formulas
+NODE_COUNTERS = {"constructions": 0, "allocations": 0}
+
+# Number of calls to `__hash__` and `is_syntaxically_eq` on formula nodes (and `FormulaSet`s),
+# only counted while `CALL_COUNTERS["active"]` is positive (see `counting_calls`)
+CALL_COUNTERS = {"hashes": 0, "equalities": 0, "active": 0}
+
+
+@contextmanager
+def counting_calls() -> Iterator[None]:
+    """
+    Counts the calls to `__hash__` and `is_syntaxically_eq` in `CALL_COUNTERS` while the context is active.
+
+    The contexts can be nested, and only cost a test in these methods the rest of the time.
+    """
+    CALL_COUNTERS["active"] += 1
+    try:
+        yield
+    finally:
+        CALL_COUNTERS["active"] -= 1
+
+
+def _forget_node(ref: KeyedRef) -> None:
+    # Called when a node is garbage collected
+    if _NODES.get(ref.key) is ref:
+        del _NODES[ref.key]
+
+
+class HashConsed:
+    """
+    Base class for hash-consed nodes.
+
+    Structurally equal nodes are the same object (see `hash_cons`), so syntactic equality is an identity check
+    and the structural hash is computed only once, when the node is built.
+    """
+
+    __slots__ = ("_hash", "_variables", "__weakref__")
+
+    if TYPE_CHECKING:
+        from .traversal import VariableSets
+
+    # Names of the attributes that define the node, in constructor order
+    _fields: tuple[str, ...]
+    _hash: int
+    # Computed on demand by `traversal.variable_sets`
+    _variables: VariableSets | None
+
+    def __hash__(self) -> int:
+        if CALL_COUNTERS["active"]:
+            CALL_COUNTERS["hashes"] += 1
+        return self._hash
+
+    def is_syntaxically_eq(self, rhs: Any) -> bool:
+        if CALL_COUNTERS["active"]:
+            CALL_COUNTERS["equalities"] += 1
+        return self is rhs
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Unpickling (and copying) goes through the constructor so the node is interned again
+        return (self.__class__, tuple(getattr(self, field) for field in self._fields))
+
+
+def hash_cons[T: HashConsed](cls: type[T], *values: Any) -> T:
+    """
+    Returns the unique node of class `cls` whose fields are `values`, building it if it doesn’t exist yet.
+
+    The values must already be converted (children are themselves hash-consed nodes).
+    """
+    NODE_COUNTERS["constructions"] += 1
+    key = (
+        cls,
+        *[
+            id(value)
+            if isinstance(value, HashConsed)
+            # Keeps 1 and 1.0 (or True) apart
+            else (type(value), value)
+            if isinstance(value, (int, float))
+            else value
+            for value in values
+        ],
+    )
+    ref = _NODES.get(key)
+    if ref is not None:
+        node = ref()
+        if node is not None:
+            return node
+    NODE_COUNTERS["allocations"] += 1
+    node = object.__new__(cls)
+    for field, value in zip(cls._fields, values):
+        setattr(node, field, value)
+    node._hash = hash((cls.__name__, *values))
+    node._variables = None
+    _NODES[key] = KeyedRef(node, _forget_node, key)
+    return node
+
 
 class ArithExpression:
     """
     Base class for all arithmetic expressions.
     """
 
+    __slots__ = ()
+
     col: int
 
     if TYPE_CHECKING:
-        from .variable import IntoVariable
+        from .traversal import Rope, VariableSets
+        from .variable import IntoVariable, Variable
 
     def __lt__(self, rhs: IntoArithExpression):
         from .comp import Comp, CompType
@@ -88,10 +193,29 @@ class ArithExpression:
 
         return ArithOp(into_arith_expr(lhs), ArithOpType.PROD, self)
 
+    def children(self) -> tuple[ArithExpression, ...]:
+        """
+        The direct sub-expressions, used by the traversals of `formula.traversal`.
+        """
+        return ()
+
+    def depth_children(self, level: int) -> tuple[tuple[ArithExpression, int], ...]:
+        return tuple((child, level) for child in self.children())
+
     def __repr_syntax__(self) -> str:
-        raise NotImplementedError(f"__repr_syntax__ not implemented for {self}")
+        from .traversal import repr_syntax
+
+        return repr_syntax(self)
 
     def __repr_depth__(self, level: int) -> str:
+        from .traversal import repr_depth
+
+        return repr_depth(self, level)
+
+    def __repr_syntax_node__(self, children: list[Rope]) -> Rope:
+        raise NotImplementedError(f"__repr_syntax__ not implemented for {self}")
+
+    def __repr_depth_node__(self, level: int, children: list[Rope]) -> Rope:
         raise NotImplementedError(f"__repr_depth__ not implemented for {self}")
 
     def __repr__(self) -> str:
@@ -103,8 +227,23 @@ class ArithExpression:
             case display.Coloring.DEPTH:  # type: ignore
                 return self.__repr_depth__(0)
 
-    def __iter__(self) -> Iterator[Any]:
-        raise NotImplementedError(f"__iter__ not implemented for {self}")
+    def __variables_node__(self, children: list[VariableSets]) -> VariableSets:
+        """
+        The variables used in this node and the free ones, given those of its `children`.
+        """
+        from .traversal import union_variables
+
+        return union_variables(children)
+
+    def __iter__(self) -> Iterator[Variable]:
+        from .traversal import variables
+
+        return iter(variables(self))
+
+    def __contains__(self, variable: Any) -> bool:
+        from .traversal import variable_sets
+
+        return variable in variable_sets(self)[0]
 
     def is_syntaxically_eq(self, rhs: Any) -> bool:
         raise NotImplementedError(f"is_syntaxically_eq not implemented for {self}")
@@ -118,9 +257,12 @@ class LogicFormula:
     Base class for logical formulas.
     """
 
+    __slots__ = ()
+
     col: int
 
     if TYPE_CHECKING:
+        from .traversal import Rope, VariableSets
         from .variable import IntoVariable, Variable
         from .variable_info import VariableInfo
 
@@ -220,19 +362,59 @@ class LogicFormula:
             into_canonical_logic_formula(self),
         )
 
+    def children(self) -> tuple[Any, ...]:
+        """
+        All the direct sub-nodes (sub-formulas and arithmetic expressions), used by the traversals of `formula.traversal`.
+        """
+        return self.sub_formulas()
+
+    def sub_formulas(self) -> tuple[LogicFormula, ...]:
+        """
+        The direct logical sub-formulas, the ones `map_formula` goes through.
+        """
+        return ()
+
+    def with_sub_formulas(self, formulas: list[LogicFormula]) -> LogicFormula:
+        """
+        The same node with its sub-formulas replaced by `formulas` (in the order of `sub_formulas`).
+        """
+        return self
+
+    def depth_children(self, level: int) -> tuple[tuple[Any, int], ...]:
+        """
+        The direct sub-nodes along with the level they are displayed at with `Coloring.DEPTH`.
+        """
+        return tuple((child, level) for child in self.children())
+
     def __repr_syntax__(self) -> str:
+        from .traversal import repr_syntax
+
+        return repr_syntax(self)
+
+    def __repr_depth__(self, level: int) -> str:
+        from .traversal import repr_depth
+
+        return repr_depth(self, level)
+
+    def __repr_syntax_node__(self, children: list[Rope]) -> Rope:
+        """
+        Displays this node, given the already displayed `children`.
+        """
         f = into_canonical_logic_formula(self)
-        if f == self:
+        if f is self:
             raise NotImplementedError(f"__repr_syntax__ is not implemented for {self}")
         else:
-            return into_canonical_logic_formula(self).__repr_syntax__()
+            return f.__repr_syntax__()
 
-    def __repr_depth__(self, level: int) -> str:
+    def __repr_depth_node__(self, level: int, children: list[Rope]) -> Rope:
+        """
+        Displays this node at depth `level`, given the already displayed `children`.
+        """
         f = into_canonical_logic_formula(self)
-        if f == self:
+        if f is self:
             raise NotImplementedError(f"__repr_depth__ is not implemented for {self}")
         else:
-            return into_canonical_logic_formula(self).__repr_depth__(level)
+            return f.__repr_depth__(level)
 
     def __repr__(self) -> str:
         match display.COLORING:
@@ -243,8 +425,23 @@ class LogicFormula:
             case display.Coloring.DEPTH:  # type: ignore
                 return self.__repr_depth__(0)
 
+    def __variables_node__(self, children: list[VariableSets]) -> VariableSets:
+        """
+        The variables used in this node and the free ones, given those of its `children`.
+        """
+        from .traversal import union_variables
+
+        return union_variables(children)
+
     def __iter__(self) -> Iterator[Variable]:
-        return iter(into_canonical_logic_formula(self))
+        from .traversal import variables
+
+        return iter(variables(self))
+
+    def __contains__(self, variable: Any) -> bool:
+        from .traversal import variable_sets
+
+        return variable in variable_sets(self)[0]
 
     @overload
     def __getitem__(
@@ -264,8 +461,10 @@ class LogicFormula:
     ):
         from .comp import Comp
         from .quantifier import Quantifier
+        from .traversal import iter_nodes
         from .variable import Variable, into_variable
 
+        # Untouched sub-formulas are returned as is (see `with_sub_formulas` and `replace`)
         if isinstance(arg, slice):
             # f[v:a]
             arg = (arg,)
@@ -274,42 +473,39 @@ class LogicFormula:
             replacements = [
                 (into_variable(sli.start), into_arith_expr(sli.stop)) for sli in arg
             ]
+            # Variables that don’t appear (even in a quantifier) have nothing to replace
+            occurring = set(
+                node.variable if isinstance(node, Quantifier) else node
+                for node in iter_nodes(into_canonical_logic_formula(self))
+                if isinstance(node, Variable) or isinstance(node, Quantifier)
+            )
+            replacements = [
+                (old, new) for old, new in replacements if old in occurring
+            ]
 
             # Replace the first variable with a placeholder name
 
             for i, (old, _) in enumerate(replacements):
+                temp = into_variable(f"__temp{i}")
 
                 def replace(node: LogicFormula):
                     if isinstance(node, Comp):
-                        node = Comp(
-                            node.expr1.replace(old, into_variable(f"__temp{i}")),
-                            node.comp,
-                            node.expr2.replace(old, into_variable(f"__temp{i}")),
-                        )
+                        node = node.replace(old, temp)
                     elif isinstance(node, Quantifier):
                         if node.variable.is_syntaxically_eq(old):
-                            node = Quantifier(
-                                node.quantifier,
-                                into_variable(f"__temp{i}"),
-                                node.formula,
-                            )
+                            node = Quantifier(node.quantifier, temp, node.formula)
                     return node
 
                 self = into_canonical_logic_formula(self).map_formula(replace)
 
             for i, (old, new) in enumerate(replacements):
+                temp = into_variable(f"__temp{i}")
 
                 def replace(node: LogicFormula):
                     if isinstance(node, Comp):
-                        node = Comp(
-                            node.expr1.replace(into_variable(f"__temp{i}"), new),
-                            node.comp,
-                            node.expr2.replace(into_variable(f"__temp{i}"), new),
-                        )
+                        node = node.replace(temp, new)
                     elif isinstance(node, Quantifier):
-                        if node.variable.is_syntaxically_eq(
-                            into_variable(f"__temp{i}")
-                        ):
+                        if node.variable.is_syntaxically_eq(temp):
                             if isinstance(new, Variable):
                                 node = Quantifier(node.quantifier, new, node.formula)
                             else:
@@ -330,11 +526,28 @@ class LogicFormula:
             into_canonical_logic_formula(rhs)
         )
 
-    def map_formula(self, fn: Callable[["LogicFormula"], Self]) -> "LogicFormula":
-        return into_canonical_logic_formula(self).map_formula(fn)
+    def map_formula(
+        self,
+        fn: Callable[["LogicFormula"], "LogicFormula"],
+        memo: dict[int, tuple[LogicFormula, LogicFormula]] | None = None,
+    ) -> "LogicFormula":
+        """
+        Rebuilds the formula bottom-up, applying `fn` on each node once its sub-formulas have been mapped.
+
+        Shared sub-formulas are only rewritten once. Passing the same `memo` to nested `map_formula` calls
+        made with the same `fn` (as the normal forms do) also shares the rewrites between these calls.
+        """
+        from .traversal import fold, sub_formulas_of
+
+        return fold(
+            into_canonical_logic_formula(self),
+            lambda node, formulas: fn(node.with_sub_formulas(formulas)),
+            sub_formulas_of,
+            {} if memo is None else memo,
+        )
 
     def __hash__(self) -> int:
-        return hash(repr(self))
+        return hash(into_canonical_logic_formula(self))
 
 
 def into_arith_expr(var: Any) -> ArithExpression:
@@ -364,31 +577,32 @@ def into_canonical_logic_formula(var: Any) -> LogicFormula:
 
     This is useful to allow, for example `forall.a(True)` without having to type `forall.a(BoolConst(True))`.
     """
+    if isinstance(var, HashConsed) and isinstance(var, LogicFormula):
+        # Fast path : nodes are already canonical
+        return var
+
     from .boolconst import BoolConst
     from .boolop import BoolOpType
-    from .forms import CNF, DNF, NNF, PNF
+    from .forms import Form
     from .formula_set import FormulaSet
 
     if isinstance(var, bool):
         return BoolConst(var)
-    elif isinstance(var, NNF):
-        return var.formula
-    elif isinstance(var, PNF):
-        return var.formula
-    elif isinstance(var, CNF):
-        return into_canonical_logic_formula(var.formula)
-    elif isinstance(var, DNF):
-        return into_canonical_logic_formula(var.formula)
+    elif isinstance(var, Form):
+        # Built once for a `DNF` or a `CNF`
+        return var.canonical()
 
     elif isinstance(var, FormulaSet):
+        # Members are converted too, a set with a single member is reduced to that member
+        formulas = map(into_canonical_logic_formula, var.iter_formulas())
         if var.boolop == BoolOpType.CONJ:
             if len(var.formulas) == 0:
                 return BoolConst(True)
-            return reduce(LogicFormula.__and__, var.iter_formulas())
+            return reduce(LogicFormula.__and__, formulas)
         else:
             if len(var.formulas) == 0:
                 return BoolConst(False)
-            return reduce(LogicFormula.__or__, var.iter_formulas())
+            return reduce(LogicFormula.__or__, formulas)
 
     else:
         if not isinstance(var, LogicFormula):
@@ -2,36 +2,43 @@ from typing import Any, Iterator
 
 from display import color, color_by_depth
 
-from .types import ArithExpression, IntoArithExpression, into_arith_expr
+from .traversal import Rope, VariableSets
+from .types import (
+    ArithExpression,
+    HashConsed,
+    IntoArithExpression,
+    hash_cons,
+    into_arith_expr,
+)
 
 # Types that can be converted into a Variable
 type IntoVariable = Variable | str
 
 
-class Variable(ArithExpression):
+class Variable(HashConsed, ArithExpression):
     """
     Arithmetic variable.
     """
 
     col = 6
+    _fields = __slots__ = ("name",)
+    name: str
 
-    def __init__(self, name: str) -> None:
-        self.name = name
+    def __new__(cls, name: str) -> "Variable":
+        return hash_cons(cls, name)
 
-    def is_syntaxically_eq(self, rhs: "Variable") -> bool:
-        return self.name == rhs.name
-
-    def __repr_syntax__(self):
+    def __repr_syntax_node__(self, children: list[Rope]):
         return f"\x1b[4m{color(self.col, self.name)}\x1b[24m"
 
-    def __repr_depth__(self, level: int):
+    def __repr_depth_node__(self, level: int, children: list[Rope]):
         return color_by_depth(level, self.name)
 
     def __iter__(self) -> Iterator["Variable"]:
         return iter([self])
 
-    def __hash__(self) -> int:
-        return hash(self.name)
+    def __variables_node__(self, children: list[VariableSets]) -> VariableSets:
+        variables = frozenset([self])
+        return (variables, variables)
 
     def replace(
         self, variable: IntoVariable, expr: IntoArithExpression
@@ -1,7 +1,4 @@
-from .boolop import BoolOp
-from .comp import Comp
-from .notb import Not
-from .quantifier import Quantifier
+from .traversal import variable_sets
 from .types import IntoLogicFormula, LogicFormula, into_canonical_logic_formula
 from .variable import Variable
 
@@ -13,6 +10,8 @@ class VariableInfo:
     Useful to get info such as free-ness (which is lazily calculated).
     """
 
+    __slots__ = ("variable", "formula")
+
     def __init__(self, f: IntoLogicFormula, v: Variable) -> None:
         f = into_canonical_logic_formula(f)
         if v not in f:
@@ -27,27 +26,4 @@ class VariableInfo:
 
         If the variable is not inside the formula, this function returns `False`.
         """
-
-        if self.variable not in self.formula:
-            return False
-        if isinstance(self.formula, BoolOp):
-            return (
-                self.variable in self.formula.formula1
-                and self.formula.formula1[self.variable].is_free()
-                or self.variable in self.formula.formula2
-                and self.formula.formula2[self.variable].is_free()
-            )
-        elif isinstance(self.formula, Comp):
-            # This assumes that v is in f which is the case
-            return True
-        elif isinstance(self.formula, Quantifier):
-            if self.formula.variable == self.variable:
-                # v is quantified in the whole inner formula
-                return False
-            else:
-                return self.formula.formula[self.variable].is_free()
-        elif isinstance(self.formula, Not):
-            return self.formula.formula[self.variable].is_free()
-        else:
-            # unreachable
-            assert False
+        return self.variable in variable_sets(self.formula)[1]
@@ -4,15 +4,27 @@ Temporary file to try recursive functions over all nodes in a tree.
 
 # TODO : decide where to put all these functions : into formula.py, setup.py, or here ?
 
+import hashlib
+from functools import reduce
+from typing import Any, Sequence
+
 # Function to dualize a formula by swapping AND and OR operators
 from formula.boolconst import BoolConst
-from formula.boolop import BoolOp, BoolOpType
-from formula.comp import Comp
+from formula.boolop import BoolOp, BoolOpBuilder, BoolOpType
+from formula.arithop import ArithOp
+from formula.comp import Comp, CompType
+from formula.formula_set import iter_operands
 from formula.notb import Not
 from formula.quantifier import Quantifier, QuantifierBuilder, QuantifierType
+from formula.traversal import fold, sub_formulas_of, variable_sets
+from formula.traversal import free_variables as sorted_free_variables
+from formula.numconst import NumConst
 from formula.types import IntoLogicFormula, LogicFormula, into_canonical_logic_formula
 from formula.variable import Variable
 
+# A node with the number of quantifiers above it and the new names of the variables they bind
+type AlphaPosition = tuple[Any, int, dict[Variable, Variable]]
+
 
 def dual(formula: IntoLogicFormula) -> LogicFormula:
     """
@@ -125,8 +137,7 @@ def free_variables(f: IntoLogicFormula) -> list[Variable]:
     """
     Lists all free variables of the formula.
     """
-    f = into_canonical_logic_formula(f)
-    return [variable for variable in f if f[variable].is_free()]
+    return sorted_free_variables(into_canonical_logic_formula(f))
 
 
 def separate_quantifiers(
@@ -173,35 +184,213 @@ def join_quantifiers(
     return f
 
 
+def push_quantifier(
+    quantifier: QuantifierType, variable: Variable, formula: LogicFormula
+) -> LogicFormula:
+    """
+    Builds `Quantifier(quantifier, variable, formula)` with the quantifier pushed as far inward as possible.
+
+    - `∃x.(a ∨ b)` -> `∃x.a ∨ ∃x.b` and `∃x.(a ∧ b)` -> `∃x.a ∧ b` if `x` isn’t free in `b`.
+    - `∀x.(a ∧ b)` -> `∀x.a ∧ ∀x.b` and `∀x.(a ∨ b)` -> `∀x.a ∨ b` if `x` isn’t free in `b`.
+    - `∃x.a` and `∀x.a` -> `a` if `x` isn’t free in `a`.
+    """
+    # The operator the quantifier distributes over, and the other one
+    outer, inner = (
+        (BoolOpType.DISJ, BoolOpType.CONJ)
+        if quantifier == QuantifierType.EXISTS
+        else (BoolOpType.CONJ, BoolOpType.DISJ)
+    )
+    # The parts of each formula the quantifier is pushed into, as the operands that use the variable
+    # and the others
+    splits: dict[int, list[tuple[list[LogicFormula], list[LogicFormula]]]] = {}
+
+    def can_split_again(bound: list[LogicFormula], others: list[LogicFormula]) -> bool:
+        # The only operand that uses the variable can be split again
+        return len(bound) == 1 and len(others) > 0
+
+    def split(node: LogicFormula) -> list[LogicFormula]:
+        parts: list[tuple[list[LogicFormula], list[LogicFormula]]] = []
+        for part in iter_operands(node, outer):
+            operands = list(iter_operands(part, inner))
+            bound = [f for f in operands if variable in variable_sets(f)[1]]
+            others = [f for f in operands if variable not in variable_sets(f)[1]]
+            parts.append((bound, others))
+        splits[id(node)] = parts
+        # The quantifier is pushed into these operands first
+        return [bound[0] for bound, others in parts if can_split_again(bound, others)]
+
+    def push(node: LogicFormula, pushed: list[LogicFormula]) -> LogicFormula:
+        pushed_parts = iter(pushed)
+        parts: list[LogicFormula] = []
+        for bound, others in splits.pop(id(node)):
+            if len(bound) == 0:
+                scoped = None
+            elif can_split_again(bound, others):
+                scoped = next(pushed_parts)
+            else:
+                scoped = Quantifier(
+                    quantifier, variable, reduce(BoolOpBuilder(inner), bound)
+                )
+            if scoped is not None:
+                others = [*others, scoped]
+            if len(others) == 0:
+                # Nothing left, the part was empty
+                others = [BoolConst(inner == BoolOpType.CONJ)]
+            parts.append(reduce(BoolOpBuilder(inner), others))
+        return reduce(BoolOpBuilder(outer), parts)
+
+    # Iterative, so that deeply nested formulas don’t reach the recursion limit
+    return fold(formula, push, split, memo={})
+
+
+def miniscope(f: IntoLogicFormula) -> LogicFormula:
+    """
+    Pushes every quantifier as far inward as possible (see `push_quantifier`),
+    so that each quantifier only applies to the sub-formula that uses its variable.
+    """
+
+    def miniscope_inner(node: LogicFormula):
+        if isinstance(node, Quantifier):
+            return push_quantifier(node.quantifier, node.variable, node.formula)
+        return node
+
+    return into_canonical_logic_formula(f).map_formula(miniscope_inner)
+
+
+def _node_digest(tag: str, *parts: bytes) -> bytes:
+    digest = hashlib.blake2b(tag.encode() + b"\0", digest_size=32)
+    for part in parts:
+        digest.update(part)
+    return digest.digest()
+
+
+def _alpha_normalize(f: IntoLogicFormula) -> tuple[Any, bytes]:
+    """
+    Computes `alpha_normalize(f)` along with a digest of each node, which only depends on the normalized node.
+    """
+    f = into_canonical_logic_formula(f)
+    # The prefix of the bound variables, so that they don’t take the name of another variable
+    names_used: set[str] = set()
+
+    def add_name(node: Any, _: list[None]) -> None:
+        if isinstance(node, Variable):
+            names_used.add(node.name)
+
+    fold(f, add_name, memo={})
+    prefix = "#"
+    while any(name.startswith(prefix) for name in names_used):
+        prefix += "#"
+
+    def children(position: AlphaPosition) -> Sequence[AlphaPosition]:
+        node, depth, names = position
+        if isinstance(node, Quantifier):
+            bound = {**names, node.variable: Variable(f"{prefix}{depth}")}
+            return [(node.formula, depth + 1, bound)]
+        elif isinstance(node, BoolOp):
+            # The whole chain of a commutative operator, to sort its operands
+            return [
+                (operand, depth, names) for operand in iter_operands(node, node.boolop)
+            ]
+        return [(child, depth, names) for child in node.children()]
+
+    def key(position: AlphaPosition) -> Any:
+        # A node is normalized once under each quantifier (the memo keeps the dictionaries alive)
+        node, depth, names = position
+        return (id(node), depth, id(names))
+
+    def normalize(
+        position: AlphaPosition, results: list[tuple[Any, bytes]]
+    ) -> tuple[Any, bytes]:
+        node, depth, names = position
+        digests = [digest for _, digest in results]
+        if isinstance(node, Variable):
+            renamed = names.get(node, node)
+            return (renamed, _node_digest("var", renamed.name.encode()))
+        elif isinstance(node, NumConst):
+            return (node, _node_digest("num", repr(node.const).encode()))
+        elif isinstance(node, BoolConst):
+            return (node, _node_digest("bool", b"1" if node.const else b"0"))
+        elif isinstance(node, ArithOp):
+            return (
+                ArithOp(results[0][0], node.arithop, results[1][0]),
+                _node_digest(node.arithop, *digests),
+            )
+        elif isinstance(node, Comp):
+            if node.comp == CompType.EQUAL and digests[1] < digests[0]:
+                results.reverse()
+                digests.reverse()
+            return (
+                Comp(results[0][0], node.comp, results[1][0]),
+                _node_digest(node.comp, *digests),
+            )
+        elif isinstance(node, Not):
+            return (Not(results[0][0]), _node_digest("not", *digests))
+        elif isinstance(node, BoolOp):
+            operands = sorted(
+                {digest: operand for operand, digest in results}.items()
+            )
+            if len(operands) == 1:
+                # `a ∧ a` is `a`
+                return (operands[0][1], operands[0][0])
+            return (
+                reduce(
+                    BoolOpBuilder(node.boolop), [operand for _, operand in operands]
+                ),
+                _node_digest(node.boolop, *[digest for digest, _ in operands]),
+            )
+        elif isinstance(node, Quantifier):
+            return (
+                Quantifier(
+                    node.quantifier, Variable(f"{prefix}{depth}"), results[0][0]
+                ),
+                _node_digest(node.quantifier, *digests),
+            )
+        raise TypeError(f"Cannot normalize {node}")
+
+    return fold((f, 0, {}), normalize, children, memo={}, key=key)
+
+
+def alpha_normalize(f: IntoLogicFormula) -> LogicFormula:
+    """
+    Rewrites a formula so that formulas that only differ by the names of their bound variables
+    and the order of the operands of `∧`, `∨` and `=` give the same formula.
+
+    Each quantified variable is renamed after the number of quantifiers above it (`#0`, `#1`, …,
+    in the order the quantifiers are bound), the operands of chains of `∧` and `∨` are deduplicated
+    and sorted, and the sides of `=` are put in a fixed order. Free variables keep their names.
+    """
+    return _alpha_normalize(f)[0]
+
+
+def formula_digest(f: IntoLogicFormula) -> str:
+    """
+    A stable digest (in hexadecimal) of `alpha_normalize(f)`, to use as a key of memoization :
+    it is the same across processes and runs for formulas that only differ by naming and operand order.
+    """
+    return _alpha_normalize(f)[1].hex()
+
+
 def compute_formula_only_constants(f: IntoLogicFormula) -> bool:
     """
     Computes the result of a formula made of only constants
     """
     f = into_canonical_logic_formula(f)
 
-    def compute_formula_only_constants_inner(node: LogicFormula):
+    def compute_formula_only_constants_inner(node: LogicFormula, values: list[bool]):
         if isinstance(node, Quantifier):
-            return node.formula.map_formula(compute_formula_only_constants_inner)
+            return values[0]
         elif isinstance(node, BoolConst):
-            return node
+            return node.const
         elif isinstance(node, BoolOp):
-            lhs = node.formula1.map_formula(compute_formula_only_constants_inner)
-            assert isinstance(lhs, BoolConst)
-            rhs = node.formula2.map_formula(compute_formula_only_constants_inner)
-            assert isinstance(rhs, BoolConst)
             if node.boolop == BoolOpType.DISJ:
-                return BoolConst(lhs.const or rhs.const)
+                return values[0] or values[1]
             else:
-                return BoolConst(lhs.const and rhs.const)
+                return values[0] and values[1]
         elif isinstance(node, Not):
-            inner = node.formula.map_formula(compute_formula_only_constants_inner)
-            assert isinstance(inner, BoolConst)
-            return BoolConst(not inner.const)
+            return not values[0]
         else:
             raise ValueError(
                 f"Unknown node type for compute_formula_only_constants : {node}"
             )
 
-    res = f.map_formula(compute_formula_only_constants_inner)
-    assert isinstance(res, BoolConst)
-    return res.const
+    return fold(f, compute_formula_only_constants_inner, sub_formulas_of)
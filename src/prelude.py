@@ -6,6 +6,7 @@ A single file that re-exports most of the useful functions and classes and const
 
 import display  # type: ignore # noqa: F401
 from decision.elim import decide  # type: ignore # noqa: F401
+from decision.batch import DecideResult, decide_many  # type: ignore # noqa: F401
 from display import Coloring, COLORING, color, color_by_depth  # type: ignore # noqa: F401
 from formula.arithop import ArithOp, ArithOpBuilder, ArithOpType
 from formula.boolconst import BoolConst
@@ -26,12 +27,15 @@ from formula.types import (
 from formula.variable import IntoVariable, Variable, into_variable  # type: ignore # noqa: F401
 from functions import (
     all_exists,  # type: ignore # noqa: F401
+    alpha_normalize,  # type: ignore # noqa: F401
     close,  # type: ignore # noqa: F401
     compute_formula_only_constants,  # type: ignore # noqa: F401
     dual,  # type: ignore # noqa: F401
+    formula_digest,  # type: ignore # noqa: F401
     free_variables,  # type: ignore # noqa: F401
     free_variables as fv,  # type: ignore # noqa: F401
     join_quantifiers,  # type: ignore # noqa: F401
+    miniscope,  # type: ignore # noqa: F401
     negation,  # type: ignore # noqa: F401
     separate_quantifiers,  # type: ignore # noqa: F401
     swap_quantifiers,  # type: ignore # noqa: F401